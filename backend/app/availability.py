@@ -0,0 +1,313 @@
+"""
+Slot availability engine
+
+Each doctor has a weekly working template (the slot labels offered on each
+weekday). Booked slots for one doctor on one day are kept as a bitmap over
+that day's template - bit i set means template slot i is taken - so a lookup
+is a dict hit plus a few bit tests and never touches Postgres.
+
+Writes in this worker update the bitmap right after their commit
+(mark_booked / mark_free). Writes made by other workers are picked up
+because every cached day expires after AVAILABILITY_TTL seconds and is then
+reloaded with one query. The database stays the source of truth for
+whether a booking succeeds, so the cache only ever decides what is offered.
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, SLOT_UNIQUE_INDEX
+from app.holds import get_hold_store
+
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", "30"))  # seconds
+# How far ahead (days) to look for alternatives when a slot is taken
+ALTERNATIVES_HORIZON = 14
+ALTERNATIVES_LIMIT = 3
+
+# weekday (0=Monday) -> slot labels; a missing weekday means closed
+WeeklyTemplate = Dict[int, List[str]]
+
+WEEKDAY_SLOTS = [
+    "08:00", "09:00", "10:00", "11:00", "12:00",
+    "14:00", "15:00", "16:00", "17:00", "18:00", "19:00", "20:00"
+]
+SATURDAY_SLOTS = [
+    "09:00", "10:00", "11:00", "12:00",
+    "14:00", "15:00", "16:00", "17:00"
+]
+
+# Weekdays: 8 AM - 8 PM, Saturday: 9 AM - 5 PM, Sunday: closed
+CLINIC_TEMPLATE: WeeklyTemplate = {
+    **{weekday: WEEKDAY_SLOTS for weekday in range(5)},
+    5: SATURDAY_SLOTS,
+}
+
+def to_day(value) -> date:
+    """Accepts a date or a 'YYYY-MM-DD' string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p")
+
+def to_time(value) -> dt_time:
+    """Accepts a time or 'HH:MM', 'HH:MM:SS', '9:00 AM'; raises ValueError otherwise"""
+    if isinstance(value, dt_time):
+        return value
+    text = str(value).strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time '{value}'")
+
+def to_slot(value) -> str:
+    """Accepts anything to_time does, returns the 'HH:MM' slot label"""
+    return to_time(value).strftime("%H:%M")
+
+def is_past(day: date, slot: str, now: Optional[datetime] = None) -> bool:
+    """True for a slot ('HH:MM') that has already started"""
+    now = now or datetime.now()
+    return day < now.date() or (day == now.date() and slot <= now.strftime("%H:%M"))
+
+class _Day:
+    __slots__ = ("slots", "index", "booked", "loaded_at")
+
+    def __init__(self, slots: List[str], booked: int, loaded_at: float):
+        self.slots = slots
+        self.index = {slot: i for i, slot in enumerate(slots)}
+        self.booked = booked
+        self.loaded_at = loaded_at
+
+def _with_holds(doctor_id: int, day: date, slots: List[dict]) -> List[dict]:
+    """Report slots held by someone confirming a booking as taken"""
+    held = get_hold_store().held_slots(doctor_id, day) if slots else None
+    if not held:
+        return slots
+    return [
+        {"time": slot["time"], "available": slot["available"] and slot["time"] not in held}
+        for slot in slots
+    ]
+
+def _range_with_holds(result: Dict[int, Dict[date, List[dict]]]) -> Dict[int, Dict[date, List[dict]]]:
+    return {
+        doctor_id: {day: _with_holds(doctor_id, day, slots) for day, slots in days.items()}
+        for doctor_id, days in result.items()
+    }
+
+class AvailabilityEngine:
+    def __init__(self, default_template: WeeklyTemplate = CLINIC_TEMPLATE, ttl: float = AVAILABILITY_TTL):
+        self.default_template = default_template
+        self.ttl = ttl
+        self._templates: Dict[int, WeeklyTemplate] = {}
+        self._days: Dict[Tuple[int, date], _Day] = {}
+        # Bumped on every local write so a reload that raced with it is not cached
+        self._generation: Dict[Tuple[int, date], int] = {}
+        self._lock = threading.Lock()
+
+    # ----- templates -----
+
+    def set_template(self, doctor_id: int, template: Optional[WeeklyTemplate]):
+        """Give a doctor their own working hours (None restores the clinic default)"""
+        with self._lock:
+            if template is None:
+                self._templates.pop(doctor_id, None)
+            else:
+                self._templates[doctor_id] = template
+            for key in [key for key in self._days if key[0] == doctor_id]:
+                del self._days[key]
+
+    def slots_for(self, doctor_id: int, day: date) -> List[str]:
+        template = self._templates.get(doctor_id, self.default_template)
+        return template.get(day.weekday(), [])
+
+    # ----- lookups -----
+
+    def cached(self, doctor_id: int, day) -> Optional[List[dict]]:
+        """Slot list from memory, or None if this day has to be (re)loaded"""
+        day = to_day(day)
+        entry = self._days.get((doctor_id, day))
+        if entry is None or time.monotonic() - entry.loaded_at > self.ttl:
+            return None
+        booked = entry.booked
+        return [
+            {"time": slot, "available": not booked >> i & 1}
+            for i, slot in enumerate(entry.slots)
+        ]
+
+    def generation(self, doctor_id: int, day) -> int:
+        return self._generation.get((doctor_id, to_day(day)), 0)
+
+    def load(self, doctor_id: int, day, booked_times: Iterable, generation: int) -> List[dict]:
+        """Store the booked slots read from the database and return the slot list"""
+        day = to_day(day)
+        key = (doctor_id, day)
+        slots = self.slots_for(doctor_id, day)
+        entry = _Day(slots, 0, time.monotonic())
+        for value in booked_times:
+            i = entry.index.get(to_slot(value))
+            if i is not None:
+                entry.booked |= 1 << i
+        with self._lock:
+            # A booking/cancel committed here while we were reading may be missing
+            # from the rows we got - serve them this once but don't cache them
+            if self._generation.get(key, 0) == generation:
+                self._days[key] = entry
+        return [
+            {"time": slot, "available": not entry.booked >> i & 1}
+            for i, slot in enumerate(slots)
+        ]
+
+    async def get(self, db: AsyncSession, doctor_id: int, day, include_holds: bool = True) -> List[dict]:
+        """Slot list for one doctor and day, hitting the database only on a miss.
+        Held slots are reported as taken unless include_holds is False.
+        """
+        day = to_day(day)
+        if not self.slots_for(doctor_id, day):
+            return []
+        slots = self.cached(doctor_id, day)
+        if slots is None:
+            generation = self.generation(doctor_id, day)
+            result = await db.execute(select(Appointment.appointment_time).where(
+                Appointment.doctor_id == doctor_id,
+                Appointment.appointment_date == day,
+                Appointment.status != "cancelled"
+            ))
+            slots = self.load(doctor_id, day, result.scalars().all(), generation)
+        return _with_holds(doctor_id, day, slots) if include_holds else slots
+
+    async def get_range(self, db: AsyncSession, doctor_ids: List[int], days: List[date]) -> Dict[int, Dict[date, List[dict]]]:
+        """Slot lists for several doctors over several days.
+
+        Days already cached are served from memory; all the others are read with
+        one grouped query over the whole range, which also warms the cache.
+        """
+        result: Dict[int, Dict[date, List[dict]]] = {doctor_id: {} for doctor_id in doctor_ids}
+        missing: Dict[Tuple[int, date], int] = {}
+        for doctor_id in doctor_ids:
+            for day in days:
+                if not self.slots_for(doctor_id, day):
+                    result[doctor_id][day] = []
+                    continue
+                slots = self.cached(doctor_id, day)
+                if slots is None:
+                    missing[(doctor_id, day)] = self.generation(doctor_id, day)
+                else:
+                    result[doctor_id][day] = slots
+        if not missing:
+            return _range_with_holds(result)
+
+        rows = await db.execute(
+            select(Appointment.doctor_id, Appointment.appointment_date, Appointment.appointment_time)
+            .where(
+                Appointment.doctor_id.in_({doctor_id for doctor_id, _ in missing}),
+                Appointment.appointment_date.between(
+                    min(day for _, day in missing), max(day for _, day in missing)
+                ),
+                Appointment.status != "cancelled"
+            )
+            .group_by(Appointment.doctor_id, Appointment.appointment_date, Appointment.appointment_time)
+        )
+        booked: Dict[Tuple[int, date], List] = {}
+        for doctor_id, day, slot in rows.all():
+            booked.setdefault((doctor_id, to_day(day)), []).append(slot)
+        for (doctor_id, day), generation in missing.items():
+            result[doctor_id][day] = self.load(doctor_id, day, booked.get((doctor_id, day), ()), generation)
+        return _range_with_holds(result)
+
+    # ----- incremental updates (call after the commit) -----
+
+    def _set(self, doctor_id: Optional[int], day, slot, booked: bool):
+        if doctor_id is None or not day or not slot:
+            return
+        day = to_day(day)
+        key = (doctor_id, day)
+        with self._lock:
+            self._generation[key] = self._generation.get(key, 0) + 1
+            entry = self._days.get(key)
+            if entry is None:
+                return
+            i = entry.index.get(to_slot(slot))
+            if i is None:
+                return
+            if booked:
+                entry.booked |= 1 << i
+            else:
+                entry.booked &= ~(1 << i)
+
+    def mark_booked(self, doctor_id: Optional[int], day, slot):
+        self._set(doctor_id, day, slot, True)
+
+    def mark_free(self, doctor_id: Optional[int], day, slot):
+        self._set(doctor_id, day, slot, False)
+
+    def invalidate(self, doctor_id: Optional[int] = None):
+        with self._lock:
+            if doctor_id is None:
+                self._days.clear()
+            else:
+                for key in [key for key in self._days if key[0] == doctor_id]:
+                    del self._days[key]
+
+availability = AvailabilityEngine()
+
+# ===== SLOT CONFLICTS =====
+
+def held_by_other(doctor_id: Optional[int], day, slot, holder: Optional[str] = None) -> bool:
+    """True if someone other than `holder` currently holds this slot"""
+    if doctor_id is None:
+        return False
+    try:
+        key = (doctor_id, to_day(day), to_slot(slot))
+    except ValueError:
+        return False
+    current = get_hold_store().holder_of(key)
+    return current is not None and current != holder
+
+def is_slot_conflict(error: IntegrityError) -> bool:
+    """True if the insert/update lost the race for a slot (partial unique index)"""
+    return SLOT_UNIQUE_INDEX in str(error.orig)
+
+async def next_free_slots(db: AsyncSession, doctor_id: int, day, limit: int = ALTERNATIVES_LIMIT) -> List[dict]:
+    """First free slots for a doctor from `day` on (never in the past)"""
+    now = datetime.now()
+    start = max(to_day(day), now.date())
+    days = [start + timedelta(days=offset) for offset in range(ALTERNATIVES_HORIZON)]
+    slots_by_day = (await availability.get_range(db, [doctor_id], days))[doctor_id]
+    free = []
+    for current in days:
+        for slot in slots_by_day[current]:
+            if is_past(current, slot["time"], now):
+                continue
+            if slot["available"]:
+                free.append({"date": current.isoformat(), "time": slot["time"]})
+                if len(free) == limit:
+                    return free
+    return free
+
+async def slot_taken_error(db: AsyncSession, doctor_id: int, day, slot, booked: bool = True) -> HTTPException:
+    """409 for a booking that hit an already booked (or, with booked=False, held) slot,
+    with the next free alternatives. The session must already be rolled back.
+    """
+    if booked:
+        availability.mark_booked(doctor_id, day, slot)
+    try:
+        alternatives = await next_free_slots(db, doctor_id, day)
+    except ValueError:
+        alternatives = []
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "code": "slot_taken",
+            "message": "This time slot is no longer available. Please choose another one.",
+            "alternatives": alternatives
+        }
+    )
@@ -0,0 +1,32 @@
+"""
+Swappable process-wide backends
+
+Slot holds, cache invalidation and idempotency keys are each kept behind an
+abstract interface with an in-process default, which is enough for a single
+worker and for local testing. With several workers, install a shared
+implementation (e.g. Redis) at startup through the module's set_*() function
+so every worker sees the same state.
+"""
+from typing import Callable, Generic, List, TypeVar
+
+T = TypeVar("T")
+
+class Backend(Generic[T]):
+    """The current implementation of one interface"""
+
+    def __init__(self, default: T):
+        self._current = default
+        self._on_set: List[Callable[[T], None]] = []
+
+    def get(self) -> T:
+        return self._current
+
+    def set(self, implementation: T):
+        self._current = implementation
+        for callback in self._on_set:
+            callback(implementation)
+
+    def on_set(self, callback: Callable[[T], None]) -> Callable[[T], None]:
+        """Run callback with every implementation installed from now on (usable as a decorator)"""
+        self._on_set.append(callback)
+        return callback
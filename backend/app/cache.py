@@ -0,0 +1,167 @@
+"""
+In-process caches for rarely changing reference data
+
+DoctorDirectory keeps a snapshot of the doctors table (a handful of rows that
+change a few times a month) so the doctor listings used by the website and
+the Telegram bot are served from memory. Views are memoised per
+(active_only, specialization) key.
+
+Writes go through invalidate(), which publishes on a Notifier - a swappable
+backend (see app.backends). LocalNotifier delivers to subscribers in this
+process only; a shared one (e.g. Redis pub/sub) installed with set_notifier()
+makes every worker drop its copy. DOCTOR_CACHE_TTL bounds how stale a worker can be
+if a notification is ever missed.
+
+Each snapshot carries a digest of its rows; the doctor listings use it as
+their ETag, so a tag always describes the snapshot the body is built from,
+however stale that snapshot is.
+"""
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.backends import Backend
+from app.models import Doctor
+
+DOCTOR_CACHE_TTL = float(os.getenv("DOCTOR_CACHE_TTL", "300"))  # seconds
+
+DOCTORS_CHANNEL = "doctors"
+
+# ===== NOTIFIERS =====
+
+class Notifier(ABC):
+    """Interface for invalidation broadcasts - publish must reach every worker, this one included"""
+
+    @abstractmethod
+    def publish(self, channel: str):
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callable[[], None]):
+        pass
+
+class LocalNotifier(Notifier):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Callable[[], None]]] = {}
+
+    def publish(self, channel: str):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            callback()
+
+    def subscribe(self, channel: str, callback: Callable[[], None]):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+_notifier: Backend[Notifier] = Backend(LocalNotifier())
+_subscriptions: List[Tuple[str, Callable[[], None]]] = []
+set_notifier = _notifier.set
+get_notifier = _notifier.get
+
+@_notifier.on_set
+def _move_subscriptions(notifier: Notifier):
+    """Existing cache subscriptions move over to a newly installed notifier"""
+    for channel, callback in _subscriptions:
+        notifier.subscribe(channel, callback)
+
+def subscribe(channel: str, callback: Callable[[], None]):
+    _subscriptions.append((channel, callback))
+    get_notifier().subscribe(channel, callback)
+
+# ===== DOCTOR DIRECTORY =====
+
+DOCTOR_COLUMNS = [column.key for column in Doctor.__table__.columns]
+
+def _snapshot(doctor: Doctor) -> SimpleNamespace:
+    """Detached copy with the same attribute names as Doctor, safe to share across requests"""
+    return SimpleNamespace(**{key: getattr(doctor, key) for key in DOCTOR_COLUMNS})
+
+def _digest(snapshot: List[SimpleNamespace]) -> str:
+    return hashlib.md5(orjson.dumps([vars(doctor) for doctor in snapshot])).hexdigest()
+
+class DoctorDirectory:
+    def __init__(self, ttl: float = DOCTOR_CACHE_TTL):
+        self.ttl = ttl
+        self._doctors: Optional[List[SimpleNamespace]] = None
+        self._digest: Optional[str] = None
+        self._views: Dict[Tuple[bool, Optional[str]], List[SimpleNamespace]] = {}
+        self._loaded_at = 0.0
+        # Bumped on every invalidation so a reload that raced with a write is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        subscribe(DOCTORS_CHANNEL, self.clear)
+
+    def _fresh(self) -> bool:
+        return self._doctors is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    def _store(self, doctors, generation: int) -> Tuple[List[SimpleNamespace], str]:
+        snapshot = [_snapshot(doctor) for doctor in doctors]
+        digest = _digest(snapshot)
+        with self._lock:
+            if self._generation == generation:
+                self._doctors = snapshot
+                self._digest = digest
+                self._views = {}
+                self._loaded_at = time.monotonic()
+        return snapshot, digest
+
+    def _view(self, doctors: List[SimpleNamespace], active_only: bool, specialization: Optional[str]) -> List[SimpleNamespace]:
+        key = (active_only, specialization)
+        view = self._views.get(key) if doctors is self._doctors else None
+        if view is None:
+            view = [
+                doctor for doctor in doctors
+                if (not active_only or doctor.is_active)
+                and (specialization is None or doctor.specialization == specialization)
+            ]
+            if doctors is self._doctors:
+                self._views[key] = view
+        return view
+
+    def get(self, db: Session, active_only: bool = False, specialization: Optional[str] = None) -> List[SimpleNamespace]:
+        """Doctors in id order, optionally only active ones and/or one specialization"""
+        doctors = self._doctors
+        if not self._fresh():
+            generation = self._generation
+            doctors, _ = self._store(db.execute(select(Doctor).order_by(Doctor.id)).scalars().all(), generation)
+        return self._view(doctors, active_only, specialization)
+
+    async def get_async(self, db: AsyncSession, active_only: bool = False, specialization: Optional[str] = None) -> List[SimpleNamespace]:
+        doctors = self._doctors
+        if not self._fresh():
+            generation = self._generation
+            result = await db.execute(select(Doctor).order_by(Doctor.id))
+            doctors, _ = self._store(result.scalars().all(), generation)
+        return self._view(doctors, active_only, specialization)
+
+    def digest(self, db: Session) -> str:
+        """Digest of the snapshot the listings are currently served from (loads one if needed)"""
+        with self._lock:
+            if self._fresh():
+                return self._digest
+            generation = self._generation
+        _, digest = self._store(db.execute(select(Doctor).order_by(Doctor.id)).scalars().all(), generation)
+        return digest
+
+    def clear(self):
+        """Drop this worker's copy (called for every notification)"""
+        with self._lock:
+            self._generation += 1
+            self._doctors = None
+            self._digest = None
+            self._views = {}
+
+    def invalidate(self):
+        """Call after committing any change to doctors - clears every worker"""
+        get_notifier().publish(DOCTORS_CHANNEL)
+
+doctor_directory = DoctorDirectory()
@@ -0,0 +1,92 @@
+"""
+Conditional GETs for the public catalogue (banners, specializations, doctors,
+clinic info)
+
+The ETag of a table-backed resource is a digest of the table's rows, read
+with one aggregate query over a few dozen rows. It is derived from database
+state alone, so every worker hands out the same tag for the same data and a
+write from anywhere - an admin endpoint on another worker, a seed script,
+manual SQL - changes it immediately; nothing has to be told about writes.
+
+Doctors are served from doctor_directory, which may lag the table by up to
+DOCTOR_CACHE_TTL; their tag is the digest of the directory snapshot instead,
+so it never runs ahead of the body it is sent with.
+
+A request whose If-None-Match still matches is answered with 304 by a
+dependency, before the endpoint queries or serialises anything else.
+"""
+import hashlib
+import os
+from typing import Any, Callable, Dict
+import orjson
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.cache import doctor_directory
+from app.database import get_db
+
+# Seconds clients may reuse a response without asking; 0 = always revalidate
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "0"))
+CACHE_CONTROL = (
+    f"public, max-age={CATALOG_MAX_AGE}" if CATALOG_MAX_AGE > 0
+    else "public, max-age=0, must-revalidate"
+)
+
+# resource -> table whose rows it is built from
+TABLES = {
+    "banners": "banners",
+    "specializations": "specializations",
+}
+
+# resource -> digest of the in-memory snapshot its responses are built from
+SNAPSHOTS: Dict[str, Callable[[Session], str]] = {
+    "doctors": doctor_directory.digest,
+}
+
+_static_digests: Dict[str, str] = {}
+
+def register_static(resource: str, content: Any):
+    """Resource whose content lives in code (clinic info): the tag is a digest of it"""
+    _static_digests[resource] = hashlib.md5(orjson.dumps(content)).hexdigest()
+
+def table_digest(db: Session, table: str) -> str:
+    # Whole-row text of every row in key order, so any insert, update or delete changes it
+    return db.execute(text(
+        f"SELECT md5(coalesce(string_agg(t::text, ',' ORDER BY t.id), '')) FROM {table} t"
+    )).scalar_one()
+
+def current_etag(resource: str, db: Session) -> str:
+    if resource in _static_digests:
+        digest = _static_digests[resource]
+    elif resource in SNAPSHOTS:
+        digest = SNAPSHOTS[resource](db)
+    else:
+        digest = table_digest(db, TABLES[resource])
+    return f'W/"{resource}-{digest}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+def conditional(resource: str) -> Callable:
+    """Dependency for a catalogue GET: 304 if the client's copy is current,
+    otherwise sets ETag/Cache-Control on the response and lets the endpoint run.
+    """
+    if resource not in TABLES and resource not in SNAPSHOTS and resource not in _static_digests:
+        raise ValueError(f"Unknown catalogue resource: {resource}")
+
+    # Plain def: the digest query is sync, so FastAPI runs it in the threadpool
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        etag = current_etag(resource, db)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return check
@@ -0,0 +1,138 @@
+"""
+Short-lived slot holds
+
+A hold reserves (doctor_id, date, time) for one holder (the Telegram user)
+while they confirm a booking. Holds expire on their own after
+SLOT_HOLD_TTL_SECONDS; availability lookups report held slots as busy and
+booking a held slot is refused for everyone but the holder. A holder has at
+most one live hold: acquiring a slot releases the holder's previous one, so
+nobody can sit on a whole day's slots.
+
+The store is a swappable backend (see app.backends): InMemoryHoldStore keeps
+holds in this process; install a shared HoldStore with set_hold_store().
+"""
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, Optional, Set, Tuple
+from app.backends import Backend
+
+SLOT_HOLD_TTL_SECONDS = int(os.getenv("SLOT_HOLD_TTL_SECONDS", "300"))
+
+# (doctor_id, day, "HH:MM")
+SlotKey = Tuple[int, date, str]
+
+class Hold:
+    __slots__ = ("id", "slot", "holder", "expires_at")
+
+    def __init__(self, id: str, slot: SlotKey, holder: str, expires_at: float):
+        self.id = id
+        self.slot = slot
+        self.holder = holder
+        self.expires_at = expires_at  # time.time() based, so it can be shown to clients
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+class HoldStore(ABC):
+    """Interface for hold backends - every method must be atomic"""
+
+    @abstractmethod
+    def acquire(self, slot: SlotKey, holder: str, ttl: int = SLOT_HOLD_TTL_SECONDS) -> Optional[Hold]:
+        """Hold a slot, releasing the holder's hold on any other slot; renews the
+        holder's own hold, None if someone else holds it
+        """
+
+    @abstractmethod
+    def release(self, hold_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get(self, hold_id: str) -> Optional[Hold]:
+        pass
+
+    @abstractmethod
+    def holder_of(self, slot: SlotKey) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def held_slots(self, doctor_id: int, day: date) -> Set[str]:
+        """Times currently held for a doctor on a day"""
+
+class InMemoryHoldStore(HoldStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_slot: Dict[SlotKey, Hold] = {}
+        self._by_id: Dict[str, Hold] = {}
+        self._by_holder: Dict[str, Hold] = {}
+
+    def _drop(self, hold: Hold):
+        self._by_id.pop(hold.id, None)
+        if self._by_slot.get(hold.slot) is hold:
+            del self._by_slot[hold.slot]
+        if self._by_holder.get(hold.holder) is hold:
+            del self._by_holder[hold.holder]
+
+    def _live(self, slot: SlotKey) -> Optional[Hold]:
+        hold = self._by_slot.get(slot)
+        if hold is not None and hold.expired:
+            self._drop(hold)
+            return None
+        return hold
+
+    def _purge(self):
+        for hold in [hold for hold in self._by_id.values() if hold.expired]:
+            self._drop(hold)
+
+    def acquire(self, slot: SlotKey, holder: str, ttl: int = SLOT_HOLD_TTL_SECONDS) -> Optional[Hold]:
+        with self._lock:
+            self._purge()
+            current = self._live(slot)
+            if current is not None:
+                if current.holder != holder:
+                    return None
+                current.expires_at = time.time() + ttl
+                return current
+            previous = self._by_holder.get(holder)
+            if previous is not None:
+                self._drop(previous)
+            hold = Hold(uuid.uuid4().hex, slot, holder, time.time() + ttl)
+            self._by_slot[slot] = hold
+            self._by_id[hold.id] = hold
+            self._by_holder[holder] = hold
+            return hold
+
+    def release(self, hold_id: str) -> bool:
+        with self._lock:
+            hold = self._by_id.get(hold_id)
+            if hold is None:
+                return False
+            self._drop(hold)
+            return not hold.expired
+
+    def get(self, hold_id: str) -> Optional[Hold]:
+        with self._lock:
+            hold = self._by_id.get(hold_id)
+            if hold is None or self._live(hold.slot) is not hold:
+                return None
+            return hold
+
+    def holder_of(self, slot: SlotKey) -> Optional[str]:
+        with self._lock:
+            hold = self._live(slot)
+            return hold.holder if hold else None
+
+    def held_slots(self, doctor_id: int, day: date) -> Set[str]:
+        with self._lock:
+            return {
+                slot[2] for slot, hold in self._by_slot.items()
+                if slot[0] == doctor_id and slot[1] == day and not hold.expired
+            }
+
+_holds: Backend[HoldStore] = Backend(InMemoryHoldStore())
+set_hold_store = _holds.set
+get_hold_store = _holds.get
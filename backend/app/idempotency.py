@@ -0,0 +1,249 @@
+"""
+Idempotent appointment creation
+
+A client that retries a booking - the bot after a timeout, a user tapping
+Confirm again, Telegram redelivering a callback - sends the same
+Idempotency-Key header with every attempt. The first attempt runs normally
+and its response is kept for IDEMPOTENCY_TTL_SECONDS; repeats get that
+response back (with Idempotent-Replayed: true) without reaching the
+endpoint, so nothing is written twice. A repeat that arrives while the first
+attempt is still running waits for it. Reusing a key with a different body
+is refused with 422.
+
+Bot bookings without the header fall back to a key derived from
+telegram_id + doctor + slot, kept only for IDEMPOTENCY_DERIVED_TTL_SECONDS -
+long enough to absorb double taps and redeliveries, short enough that a
+user who cancels can book the same slot again. Only successful (2xx)
+responses are kept under a derived key: a refused attempt (slot taken,
+invalid data) must not stop the same user's later, valid one.
+
+Server errors (5xx) are not kept, so a retry after one runs again.
+
+The store is a swappable backend (see app.backends): the default lives in
+this process; install a shared IdempotencyStore with set_idempotency_store().
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+import orjson
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.backends import Backend
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_DERIVED_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_DERIVED_TTL_SECONDS", "120"))
+# How long a repeat waits for the first attempt (bot requests time out after 15s)
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "15"))
+# A claim whose request never finished (crashed worker) is dropped after this
+IDEMPOTENCY_LOCK_SECONDS = 60
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+class StoredResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+class Entry:
+    __slots__ = ("fingerprint", "response", "expires_at")
+
+    def __init__(self, fingerprint: Optional[str], response: Optional[StoredResponse], expires_at: float):
+        self.fingerprint = fingerprint
+        self.response = response  # None while the first attempt is running
+        self.expires_at = expires_at
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+class IdempotencyStore(ABC):
+    """Interface for idempotency backends - every method must be atomic"""
+
+    @abstractmethod
+    def claim(self, key: str, fingerprint: Optional[str]) -> Optional[Entry]:
+        """Claim a key for a new request; None if claimed, else the existing entry"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Entry]:
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, response: StoredResponse, ttl: int):
+        pass
+
+    @abstractmethod
+    def release(self, key: str):
+        """Drop a claim whose request failed, so the next attempt runs again"""
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Entry] = {}
+
+    def _live(self, key: str) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expired:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _purge(self):
+        for key in [key for key, entry in self._entries.items() if entry.expired]:
+            del self._entries[key]
+
+    def claim(self, key: str, fingerprint: Optional[str]) -> Optional[Entry]:
+        with self._lock:
+            self._purge()
+            entry = self._live(key)
+            if entry is not None:
+                return entry
+            self._entries[key] = Entry(fingerprint, None, time.time() + IDEMPOTENCY_LOCK_SECONDS)
+            return None
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            return self._live(key)
+
+    def complete(self, key: str, response: StoredResponse, ttl: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            fingerprint = entry.fingerprint if entry is not None else None
+            self._entries[key] = Entry(fingerprint, response, time.time() + ttl)
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.response is None:
+                del self._entries[key]
+
+_store: Backend[IdempotencyStore] = Backend(InMemoryIdempotencyStore())
+set_idempotency_store = _store.set
+get_idempotency_store = _store.get
+
+def bot_booking_key(body: bytes) -> Optional[str]:
+    """Key for a bot booking sent without the header: same user, same slot"""
+    try:
+        data = orjson.loads(body)
+        # str(), like the holder of a slot hold
+        telegram_id = str(data["patient_data"]["telegram_id"])
+        return f"{telegram_id}:{data['doctor_id']}:{data['date']}:{data['time']}"
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        return None
+
+# POST path -> derives a key when the client sent none (or None: header only)
+IDEMPOTENT_PATHS: Dict[str, Optional[Callable[[bytes], Optional[str]]]] = {
+    "/api/appointments": None,
+    "/api/bot/appointments": bot_booking_key,
+}
+
+async def _error(send: Send, status: int, detail: str):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _replay(send: Send, response: StoredResponse):
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": response.headers + [(REPLAYED_HEADER.lower().encode(), b"true")],
+    })
+    await send({"type": "http.response.body", "body": response.body})
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, paths: Dict[str, Optional[Callable[[bytes], Optional[str]]]] = IDEMPOTENT_PATHS):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "").rstrip("/")
+        if scope["type"] != "http" or scope["method"] != "POST" or path not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        async def replay_receive() -> Message:
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        key = Headers(scope=scope).get(IDEMPOTENCY_HEADER)
+        if key is not None:
+            key = key.strip()
+            if not key or len(key) > MAX_KEY_LENGTH:
+                await _error(send, 400, f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+                return
+            fingerprint = hashlib.sha256(body).hexdigest()
+            ttl = IDEMPOTENCY_TTL_SECONDS
+            # An explicit key replays whatever the first attempt got, refusals included
+            successes_only = False
+        else:
+            derive = self.paths[path]
+            key = derive(body) if derive else None
+            if key is None:
+                await self.app(scope, replay_receive, send)
+                return
+            # The derived key already identifies the request
+            fingerprint = None
+            ttl = IDEMPOTENCY_DERIVED_TTL_SECONDS
+            successes_only = True
+        key = f"{path}:{key}"
+
+        idempotency = get_idempotency_store()
+        entry = idempotency.claim(key, fingerprint)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                await _error(send, 422, f"{IDEMPOTENCY_HEADER} was already used for a different request")
+                return
+            deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+            while entry is not None and entry.response is None and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = idempotency.get(key)
+            if entry is not None and entry.response is not None:
+                await _replay(send, entry.response)
+                return
+            if entry is not None:
+                await _error(send, 409, "A request with this key is still being processed")
+                return
+            # The first attempt failed and gave the key up - run this one
+            if idempotency.claim(key, fingerprint) is not None:
+                await _error(send, 409, "A request with this key is still being processed")
+                return
+
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def recording_send(message: Message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, recording_send)
+        except BaseException:
+            idempotency.release(key)
+            raise
+        if status < 300 or (status < 500 and not successes_only):
+            idempotency.complete(key, StoredResponse(status, headers, b"".join(chunks)), ttl)
+        else:
+            idempotency.release(key)
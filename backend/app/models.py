@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Float, Text, Date, DateTime, Time, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 
 class Admin(Base):
@@ -46,27 +46,59 @@ class Doctor(Base):
     specialization_rel = relationship("Specialization", back_populates="doctors")
     appointments = relationship("Appointment", back_populates="doctor")
 
+SLOT_UNIQUE_INDEX = "uq_appointments_doctor_slot"
+
 class Appointment(Base):
     __tablename__ = "appointments"
     
     id = Column(Integer, primary_key=True, index=True)
-    telegram_id = Column(String(50), index=True, nullable=True)  # For bot bookings
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)  # Link to Patient
+    telegram_id = Column(String(50), nullable=True)  # For bot bookings
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True, nullable=True)  # Link to Patient (set on every create)
     patient_name = Column(String(100), nullable=False)
     patient_email = Column(String(100), index=True)
-    patient_phone = Column(String(20), nullable=False)
+    patient_phone = Column(String(20), index=True, nullable=False)
     patient_age = Column(Integer)
     patient_gender = Column(String(20))
     doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=True)
     specialization = Column(String(100), nullable=False)
-    appointment_date = Column(String(20), nullable=False)  # YYYY-MM-DD
-    appointment_time = Column(String(20), nullable=False)  # HH:MM
+    appointment_date = Column(Date, nullable=False)  # served as YYYY-MM-DD
+    appointment_time = Column(Time, nullable=False)  # served as HH:MM
     status = Column(String(20), default="pending")  # pending, confirmed, completed, cancelled
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     doctor = relationship("Doctor", back_populates="appointments")
     patient = relationship("Patient", backref="appointments")
+    
+    __table_args__ = (
+        # Keyset pagination order for the admin listing (created_at DESC, id DESC)
+        Index("ix_appointments_created_at_id", "created_at", "id"),
+        Index("ix_appointments_status_created_at", "status", "created_at"),
+        # Same order for one doctor's appointments (doctor_id filter)
+        Index("ix_appointments_doctor_created_at_id", "doctor_id", "created_at", "id"),
+        # Doctor schedule / availability range scans
+        Index("ix_appointments_doctor_date_time", "doctor_id", "appointment_date", "appointment_time"),
+        # "My appointments" for a Telegram user, newest first
+        Index("ix_appointments_telegram_date", "telegram_id", "appointment_date"),
+        Index("ix_appointments_specialization_date", "specialization", "appointment_date"),
+        # A doctor's slot can be held by one live appointment; cancelled ones don't count
+        Index(
+            SLOT_UNIQUE_INDEX, "doctor_id", "appointment_date", "appointment_time",
+            unique=True,
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'")
+        ),
+    )
+
+class AppointmentDailyStat(Base):
+    """Per-day appointment counts, maintained incrementally by app.rollups"""
+    __tablename__ = "appointment_daily_stats"
+    
+    day = Column(Date, primary_key=True)  # Date the appointment was booked (created_at)
+    doctor_id = Column(Integer, primary_key=True, default=0)  # 0 = no doctor assigned
+    specialization = Column(String(100), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class Patient(Base):
     __tablename__ = "patients"
@@ -84,6 +116,15 @@ class Patient(Base):
     medical_history = Column(Text)
     allergies = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Patient search: phone LIKE 'prefix%' and name ILIKE '%fragment%' (pg_trgm)
+        Index("ix_patients_phone_prefix", "phone", postgresql_ops={"phone": "varchar_pattern_ops"}),
+        Index(
+            "ix_patients_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
 
 class Banner(Base):
     __tablename__ = "banners"
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort key of the last row on the previous page, so the next page
+# is a plain index range scan - no OFFSET, cost stays flat however deep you page.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    payload = {"c": created_at.isoformat() if created_at else None, "i": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def encode_id_cursor(row_id: int) -> str:
+    """Cursor for listings ordered by id alone"""
+    return encode_cursor(None, row_id)
+
+def decode_id_cursor(cursor: str) -> int:
+    return decode_cursor(cursor)[1]
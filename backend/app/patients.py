@@ -0,0 +1,75 @@
+"""
+Patient resolution for the booking paths
+
+A booking finds or creates its patient with one INSERT ... ON CONFLICT
+statement, run in the booking's own transaction: the patient and the
+appointment commit together, and two bookings by the same person at the same
+time resolve to the same row instead of one of them failing on a unique
+constraint (the second waits for the first and then takes the update branch).
+"""
+from typing import Optional, Tuple
+from sqlalchemy import Integer, String, exists, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Patient
+
+async def upsert_telegram_patient(
+    db: AsyncSession,
+    telegram_id: str,
+    name: Optional[str] = None,
+    phone: Optional[str] = None,
+    email: Optional[str] = None
+) -> Tuple[int, str, str, Optional[str]]:
+    """Patient of a Telegram user, keyed by telegram_id.
+
+    A new patient gets the given details (name/phone fall back to placeholders);
+    an existing one has its name and phone replaced when non-empty ones are given.
+    Returns (id, name, phone, email).
+    """
+    stmt = insert(Patient).values(
+        telegram_id=telegram_id,
+        name=name or "Telegram User",
+        phone=phone or "N/A",
+        email=email
+    )
+    updates = {}
+    if name:
+        updates["name"] = stmt.excluded.name
+    if phone:
+        updates["phone"] = stmt.excluded.phone
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Patient.telegram_id],
+        # A no-op update still locks the row and makes RETURNING report it
+        set_=updates or {"telegram_id": stmt.excluded.telegram_id}
+    ).returning(Patient.id, Patient.name, Patient.phone, Patient.email)
+    return tuple((await db.execute(stmt)).one())
+
+async def resolve_web_patient(
+    db: AsyncSession,
+    name: str,
+    phone: str,
+    email: Optional[str] = None,
+    age: Optional[int] = None,
+    gender: Optional[str] = None
+) -> int:
+    """Id of the patient with this email, else with this phone, else of a new one"""
+    source = select(
+        literal(name, String),
+        literal(email, String),
+        literal(phone, String),
+        literal(age, Integer),
+        literal(gender, String)
+    )
+    by_email = select(Patient.id).where(Patient.email == email)
+    if email:
+        source = source.where(~exists(by_email))
+    stmt = insert(Patient).from_select(["name", "email", "phone", "age", "gender"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Patient.phone],
+        set_={"phone": stmt.excluded.phone}
+    ).returning(Patient.id)
+    if not email:
+        return (await db.execute(stmt)).scalar_one()
+    inserted = stmt.cte("inserted")
+    # Exactly one branch has a row: the email match, or the inserted/updated patient
+    return (await db.execute(union_all(by_email, select(inserted.c.id)).limit(1))).scalar_one()
@@ -0,0 +1,191 @@
+"""
+PDF summary reports
+
+Rendering (reportlab) runs in a process pool so a big report never blocks an
+API worker. Reports are identified by their time window, so the report id
+doubles as the cache key and any worker can serve or regenerate it:
+finished PDFs are kept on disk for REPORT_CACHE_TTL seconds and an identical
+request in that window is served from the file. Every render also deletes
+report files that expired long ago, so the directory does not grow forever.
+
+This module must not import the database layer - pool processes import it.
+"""
+import asyncio
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.join(tempfile.gettempdir(), "hospital_reports"))
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "600"))  # seconds
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Renders in progress; a task removes itself when it finishes
+_inflight: Dict[str, asyncio.Task] = {}
+# Failed renders waiting to be reported: report id -> (failed at, error)
+_failures: Dict[str, Tuple[float, BaseException]] = {}
+
+# ===== REPORT IDS =====
+
+def report_id_for(start: Optional[date], end: Optional[date]) -> str:
+    return f"summary_{start.isoformat() if start else 'all'}_{end.isoformat() if end else 'all'}"
+
+def parse_report_id(report_id: str) -> Tuple[Optional[date], Optional[date]]:
+    """Inverse of report_id_for; raises ValueError for anything else"""
+    prefix, start, end = report_id.split("_")
+    if prefix != "summary":
+        raise ValueError(report_id)
+    return (
+        None if start == "all" else date.fromisoformat(start),
+        None if end == "all" else date.fromisoformat(end),
+    )
+
+# ===== RENDERING (runs in the process pool) =====
+
+def render_summary_pdf(data: dict) -> bytes:
+    """Render the admin summary; data is plain dicts/lists so it pickles cheaply"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Hospital Data Summary")
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.2, 0.4, 0.6)),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.Color(0.95, 0.95, 0.95)]),
+    ])
+
+    story = [
+        Paragraph("Hospital Data Summary", styles["Title"]),
+        Paragraph(f"Period: {data['period']}", styles["Normal"]),
+        Paragraph(f"Generated: {data['generated']}", styles["Normal"]),
+        Spacer(1, 16),
+        Paragraph("Statistics", styles["Heading2"]),
+    ]
+    stats_table = Table([["Metric", "Value"]] + [list(row) for row in data["statistics"]], hAlign="LEFT")
+    stats_table.setStyle(table_style)
+    story.append(stats_table)
+
+    if data["doctors"]:
+        story += [Spacer(1, 16), Paragraph("Appointments by Doctor", styles["Heading2"])]
+        doctor_table = Table([["Doctor", "Appointments"]] + [list(row) for row in data["doctors"]], hAlign="LEFT")
+        doctor_table.setStyle(table_style)
+        story.append(doctor_table)
+
+    story += [Spacer(1, 16), Paragraph("Recent Appointments (Last 10)", styles["Heading2"])]
+    if data["recent"]:
+        recent_table = Table(
+            [["Date", "Time", "Patient", "Doctor", "Status"]] + [list(row) for row in data["recent"]],
+            hAlign="LEFT"
+        )
+        recent_table.setStyle(table_style)
+        story.append(recent_table)
+    else:
+        story.append(Paragraph("No appointments in this period.", styles["Normal"]))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork a process that is running an event loop and DB pools
+        _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+# ===== CACHE / JOBS =====
+
+def report_path(report_id: str) -> str:
+    return os.path.join(REPORT_DIR, f"{report_id}.pdf")
+
+def cached_report(report_id: str) -> Optional[str]:
+    """Path of a finished report that is still fresh, else None"""
+    path = report_path(report_id)
+    try:
+        if time.time() - os.path.getmtime(path) < REPORT_CACHE_TTL:
+            return path
+    except OSError:
+        pass
+    return None
+
+def purge_expired_reports() -> List[str]:
+    """Delete report files (and leftover temp files) well past their TTL.
+
+    Files are kept for twice the TTL so a download that has just found a
+    fresh file never loses it to a purge in another worker.
+    """
+    cutoff = time.time() - 2 * REPORT_CACHE_TTL
+    removed = []
+    try:
+        names = os.listdir(REPORT_DIR)
+    except OSError:
+        return removed
+    for name in names:
+        if not name.startswith("summary_"):
+            continue
+        path = os.path.join(REPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(name)
+        except OSError:
+            pass  # already gone (another worker purged it)
+    return removed
+
+async def _generate(report_id: str, collect: Callable[[], dict]) -> str:
+    loop = asyncio.get_running_loop()
+    # DB reads in a thread, rendering in another process - the event loop never blocks
+    data = await loop.run_in_executor(None, collect)
+    pdf = await loop.run_in_executor(_get_pool(), render_summary_pdf, data)
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = report_path(report_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp_path, path)  # atomic, other workers never see a partial file
+    await loop.run_in_executor(None, purge_expired_reports)
+    return path
+
+def _finished(report_id: str, task: asyncio.Task):
+    if _inflight.get(report_id) is task:
+        del _inflight[report_id]
+    if task.cancelled():
+        return
+    error = task.exception()  # also marks the error as retrieved
+    if error is not None:
+        now = time.time()
+        for stale in [key for key, (failed_at, _) in _failures.items() if now - failed_at > REPORT_CACHE_TTL]:
+            del _failures[stale]
+        _failures[report_id] = (now, error)
+
+def start_report(report_id: str, collect: Callable[[], dict]) -> Optional[asyncio.Task]:
+    """Return None if a fresh PDF is cached, else the (possibly shared) render task"""
+    if cached_report(report_id):
+        return None
+    task = _inflight.get(report_id)
+    if task is None:
+        _failures.pop(report_id, None)
+        task = asyncio.create_task(_generate(report_id, collect))
+        task.add_done_callback(lambda done: _finished(report_id, done))
+        _inflight[report_id] = task
+    return task
+
+def pop_failure(report_id: str) -> Optional[BaseException]:
+    """Error of a failed render for this id (reported once, then forgotten)"""
+    failure = _failures.pop(report_id, None)
+    return failure[1] if failure else None
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,67 @@
+"""
+Fast JSON responses
+
+FastJSONResponse encodes with orjson instead of the stdlib json module and is
+the app's default response class.
+
+trusted_json() is the opt-in fast path for endpoints that already build
+plain dicts (doctor_to_response, banner_to_response, ...). Returning a
+Response from an endpoint makes FastAPI skip both the response_model
+validation and jsonable_encoder; orjson encodes the dicts directly
+(datetime, date and time included). Passing `model` keeps the output shaped
+like the declared response_model - only its fields, in its order, missing
+ones filled with their defaults - without validating anything.
+"""
+from typing import Any, Dict, Optional, Tuple, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+_model_fields: Dict[Type[BaseModel], Tuple[Tuple[str, Any], ...]] = {}
+
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    fields = _model_fields.get(model)
+    if fields is None:
+        fields = tuple(
+            (name, None if field.is_required() else field.get_default(call_default_factory=True))
+            for name, field in model.model_fields.items()
+        )
+        _model_fields[model] = fields
+    return fields
+
+def _shape(item: dict, fields: Tuple[Tuple[str, Any], ...]) -> dict:
+    return {name: item.get(name, default) for name, default in fields}
+
+def trusted_json(
+    content: Any,
+    model: Optional[Type[BaseModel]] = None,
+    response: Optional[Response] = None,
+    status_code: int = 200
+) -> FastJSONResponse:
+    """Send dicts built by our own *_to_response helpers without re-validating them.
+
+    content:  a dict or a list of dicts
+    model:    the endpoint's response_model (item model for lists) to project onto
+    response: the endpoint's injected Response, so headers set on it by the
+              endpoint or its dependencies (X-Next-Cursor, ETag, ...) are kept
+    """
+    if model is not None:
+        fields = _fields(model)
+        if isinstance(content, list):
+            content = [_shape(item, fields) for item in content]
+        else:
+            content = _shape(content, fields)
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                result.headers[name] = value
+    return result
@@ -0,0 +1,134 @@
+"""
+Daily appointment rollup (appointment_daily_stats)
+
+Keeps one count per (day, doctor_id, specialization, status) so the analytics
+charts read a few hundred rows instead of scanning the appointments table.
+
+The table is maintained from session events, in the same transaction as the
+appointment write, so every create / status-change / cancel path (admin
+appointments, Telegram bot, web chat) updates it without extra code:
+  - before a flush, rows about to change or be deleted are locked
+    (SELECT ... FOR UPDATE) and their current buckets counted -1; the lock
+    makes a concurrent change of the same appointment wait and then read
+    the committed values, so the same old bucket is never subtracted twice
+  - after the flush, new and changed rows are counted +1 in their new buckets
+  - just before commit the summed deltas are upserted in one statement, in
+    key order. Bucket rows are therefore locked only while the transaction
+    commits. Same-day bookings of a doctor share a bucket, but they wait on
+    each other only for that moment, not for the whole booking transaction.
+
+Rebuild from scratch (e.g. after first deploy, or to repair drift):
+    python -m app.rollups rebuild
+"""
+import sys
+from collections import Counter
+from sqlalchemy import event, inspect, select, delete, cast, func, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Appointment, AppointmentDailyStat
+
+# Changing any of these moves an appointment to a different rollup bucket
+TRACKED_ATTRIBUTES = ("status", "doctor_id", "specialization", "created_at")
+
+_PENDING_KEY = "rollup_pending_ids"
+_DELTAS_KEY = "rollup_deltas"
+
+def _bucket_columns():
+    return (
+        cast(Appointment.created_at, Date),
+        func.coalesce(Appointment.doctor_id, 0),
+        Appointment.specialization,
+        func.coalesce(Appointment.status, "pending"),
+    )
+
+def _count(session: Session, appointment_ids, delta: int, lock: bool = False):
+    """Add delta to the pending bucket deltas for each appointment, as currently stored in the DB"""
+    if not appointment_ids:
+        return
+    stmt = select(*_bucket_columns()).where(Appointment.id.in_(appointment_ids))
+    if lock:
+        stmt = stmt.with_for_update(of=Appointment)
+    deltas = session.info.setdefault(_DELTAS_KEY, Counter())
+    for bucket in session.connection().execute(stmt):
+        deltas[tuple(bucket)] += delta
+
+def _apply(connection, deltas: Counter):
+    """Upsert the summed deltas, one row per bucket, in key order (a fixed lock order)"""
+    rows = [
+        {"day": day, "doctor_id": doctor_id, "specialization": specialization, "status": status, "count": delta}
+        for (day, doctor_id, specialization, status), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    stmt = insert(AppointmentDailyStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "doctor_id", "specialization", "status"],
+        set_={"count": AppointmentDailyStat.count + stmt.excluded["count"]},
+    )
+    connection.execute(stmt)
+
+def _bucket_changed(session: Session, obj: Appointment) -> bool:
+    if not session.is_modified(obj, include_collections=False):
+        return False
+    attrs = inspect(obj).attrs
+    return any(attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES)
+
+@event.listens_for(Session, "before_flush")
+def _subtract_old_buckets(session: Session, flush_context, instances):
+    changed = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, Appointment) and obj.id is not None and _bucket_changed(session, obj)
+    ]
+    deleted = [
+        obj.id for obj in session.deleted
+        if isinstance(obj, Appointment) and obj.id is not None
+    ]
+    if not changed and not deleted:
+        return
+    _count(session, changed + deleted, -1, lock=True)
+    # Changed rows get re-added with their new values once the flush has run
+    session.info.setdefault(_PENDING_KEY, []).extend(changed)
+
+@event.listens_for(Session, "after_flush")
+def _add_new_buckets(session: Session, flush_context):
+    ids = session.info.pop(_PENDING_KEY, [])
+    ids += [obj.id for obj in session.new if isinstance(obj, Appointment)]
+    _count(session, ids, 1)
+
+@event.listens_for(Session, "before_commit")
+def _write_deltas(session: Session):
+    # commit() fires this before its own final flush; flush here so nothing is missed
+    session.flush()
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        _apply(session.connection(), deltas)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_DELTAS_KEY, None)
+
+def rebuild(db: Session) -> int:
+    """Recompute the whole rollup table from the appointments table"""
+    bucket = _bucket_columns()
+    db.execute(delete(AppointmentDailyStat))
+    db.execute(
+        insert(AppointmentDailyStat).from_select(
+            ["day", "doctor_id", "specialization", "status", "count"],
+            select(*bucket, func.count(Appointment.id)).group_by(*bucket),
+        )
+    )
+    db.commit()
+    return db.query(func.count()).select_from(AppointmentDailyStat).scalar()
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.rollups rebuild")
+        sys.exit(1)
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt appointment_daily_stats: {rebuild(db)} rows")
+    finally:
+        db.close()
@@ -1,16 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, select, true
 from app.database import get_db
-from app.models import Admin, Doctor, Specialization, Appointment, Patient
+from app.models import Admin, Doctor, Specialization, Appointment, AppointmentDailyStat, Patient
 from app.schemas import AdminRegister, AdminLogin, AdminAuthResponse, AdminResponse, DashboardStatsResponse, DashboardStats
 from app.auth import get_password_hash, verify_password, create_access_token, get_current_admin
 
 router = APIRouter()
 
 @router.post("/register", response_model=AdminAuthResponse)
-async def register(admin_data: AdminRegister, db: Session = Depends(get_db)):
+def register(admin_data: AdminRegister, db: Session = Depends(get_db)):
     # Check if admin with email already exists
     existing_admin = db.query(Admin).filter(Admin.email == admin_data.email).first()
     if existing_admin:
@@ -41,7 +40,7 @@ async def register(admin_data: AdminRegister, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=AdminAuthResponse)
-async def login(admin_data: AdminLogin, db: Session = Depends(get_db)):
+def login(admin_data: AdminLogin, db: Session = Depends(get_db)):
     # Find admin by email
     admin = db.query(Admin).filter(Admin.email == admin_data.email).first()
     if not admin or not verify_password(admin_data.password, admin.password):
@@ -60,53 +59,76 @@ async def login(admin_data: AdminLogin, db: Session = Depends(get_db)):
     }
 
 @router.get("/stats", response_model=DashboardStatsResponse)
-async def get_dashboard_stats(current_admin: Admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    # Get statistics
-    total_doctors = db.query(func.count(Doctor.id)).scalar() or 0
-    active_doctors = db.query(func.count(Doctor.id)).filter(Doctor.is_active == True).scalar() or 0
-    
-    total_specializations = db.query(func.count(Specialization.id)).scalar() or 0
-    active_specializations = db.query(func.count(Specialization.id)).filter(Specialization.is_active == True).scalar() or 0
-    
-    total_appointments = db.query(func.count(Appointment.id)).scalar() or 0
-    pending_appointments = db.query(func.count(Appointment.id)).filter(Appointment.status == "pending").scalar() or 0
-    confirmed_appointments = db.query(func.count(Appointment.id)).filter(Appointment.status == "confirmed").scalar() or 0
-    completed_appointments = db.query(func.count(Appointment.id)).filter(Appointment.status == "completed").scalar() or 0
-    
-    total_patients = db.query(func.count(Patient.id)).scalar() or 0
-    
-    # Get recent appointments (last 10)
-    recent_appointments_query = db.query(Appointment).order_by(Appointment.created_at.desc()).limit(10).all()
+def get_dashboard_stats(current_admin: Admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+    # Get statistics - every counter in one round trip, each table scanned once
+    # (one single-row aggregate per table, cross joined together)
+    doctor_counts = select(
+        func.count(Doctor.id).label("total"),
+        func.count(Doctor.id).filter(Doctor.is_active == True).label("active")
+    ).subquery()
+    specialization_counts = select(
+        func.count(Specialization.id).label("total"),
+        func.count(Specialization.id).filter(Specialization.is_active == True).label("active")
+    ).subquery()
+    appointment_counts = select(
+        func.count(Appointment.id).label("total"),
+        func.count(Appointment.id).filter(Appointment.status == "pending").label("pending"),
+        func.count(Appointment.id).filter(Appointment.status == "confirmed").label("confirmed"),
+        func.count(Appointment.id).filter(Appointment.status == "completed").label("completed")
+    ).subquery()
+    patient_counts = select(func.count(Patient.id).label("total")).subquery()
+    
+    counts = db.execute(
+        select(
+            doctor_counts.c.total.label("total_doctors"),
+            doctor_counts.c.active.label("active_doctors"),
+            specialization_counts.c.total.label("total_specializations"),
+            specialization_counts.c.active.label("active_specializations"),
+            appointment_counts.c.total.label("total_appointments"),
+            appointment_counts.c.pending.label("pending_appointments"),
+            appointment_counts.c.confirmed.label("confirmed_appointments"),
+            appointment_counts.c.completed.label("completed_appointments"),
+            patient_counts.c.total.label("total_patients")
+        ).select_from(
+            doctor_counts
+            .join(specialization_counts, true())
+            .join(appointment_counts, true())
+            .join(patient_counts, true())
+        )
+    ).one()
+    
+    # Get recent appointments (last 10) with their doctor joined in
+    recent_appointments_query = (
+        db.query(Appointment)
+        .options(joinedload(Appointment.doctor))
+        .order_by(Appointment.created_at.desc())
+        .limit(10)
+        .all()
+    )
     recent_appointments = []
     for apt in recent_appointments_query:
-        doctor_name = None
-        if apt.doctor_id:
-            doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
-            if doctor:
-                doctor_name = doctor.name
-        
         recent_appointments.append({
             "id": apt.id,
             "patientName": apt.patient_name,
             "patientEmail": apt.patient_email,
-            "doctorName": doctor_name,
+            "doctorName": apt.doctor.name if apt.doctor else None,
             "specialization": apt.specialization,
-            "appointmentDate": apt.appointment_date,
-            "appointmentTime": apt.appointment_time,
+            "appointmentDate": apt.appointment_date.isoformat(),
+            "appointmentTime": apt.appointment_time.strftime("%H:%M"),
             "status": apt.status,
             "createdAt": apt.created_at.isoformat() if apt.created_at else None
         })
     
     stats = DashboardStats(
-        totalDoctors=total_doctors,
-        activeDoctors=active_doctors,
-        totalSpecializations=total_specializations,
-        activeSpecializations=active_specializations,
-        totalAppointments=total_appointments,
-        pendingAppointments=pending_appointments,
-        confirmedAppointments=confirmed_appointments,
-        completedAppointments=completed_appointments,
-        totalPatients=total_patients,
+        totalDoctors=counts.total_doctors or 0,
+        activeDoctors=counts.active_doctors or 0,
+        totalSpecializations=counts.total_specializations or 0,
+        activeSpecializations=counts.active_specializations or 0,
+        totalAppointments=counts.total_appointments or 0,
+        pendingAppointments=counts.pending_appointments or 0,
+        confirmedAppointments=counts.confirmed_appointments or 0,
+        completedAppointments=counts.completed_appointments or 0,
+        totalPatients=counts.total_patients or 0,
         recentAppointments=recent_appointments
     )
     
@@ -117,28 +139,27 @@ async def get_dashboard_stats(current_admin: Admin = Depends(get_current_admin),
 
 
 @router.get("/analytics")
-async def get_analytics_data(current_admin: Admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+def get_analytics_data(current_admin: Admin = Depends(get_current_admin), db: Session = Depends(get_db)):
     """Get real-time analytics data for charts"""
     from datetime import datetime, timedelta
     from collections import defaultdict
     
-    # Get all appointments
-    all_appointments = db.query(Appointment).all()
+    # Charts read the daily rollup (app.rollups), never the appointments table
+    stat_count = func.sum(AppointmentDailyStat.count)
     
     # Monthly appointments (last 6 months)
     monthly_data = defaultdict(int)
     six_months_ago = datetime.now() - timedelta(days=180)
     
-    for apt in all_appointments:
-        if apt.created_at:
-            # Handle timezone awareness for comparison
-            created_at = apt.created_at
-            if created_at.tzinfo is not None:
-                created_at = created_at.replace(tzinfo=None)
-                
-            if created_at >= six_months_ago:
-                month_key = created_at.strftime("%b")
-                monthly_data[month_key] += 1
+    month_bucket = func.date_trunc("month", AppointmentDailyStat.day)
+    monthly_rows = (
+        db.query(month_bucket.label("month"), stat_count)
+        .filter(AppointmentDailyStat.day >= six_months_ago.date())
+        .group_by(month_bucket)
+        .all()
+    )
+    for month_start, count in monthly_rows:
+        monthly_data[month_start.strftime("%b")] += count
     
     # Generate last 6 months
     months = []
@@ -150,20 +171,18 @@ async def get_analytics_data(current_admin: Admin = Depends(get_current_admin),
             "appointments": monthly_data.get(month_name, 0)
         })
     
-    # Weekly appointments (last 7 days)
+    # Weekly appointments (last 7 days, today included)
     weekly_data = defaultdict(int)
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    
-    for apt in all_appointments:
-        if apt.created_at:
-            # Handle timezone awareness for comparison
-            created_at = apt.created_at
-            if created_at.tzinfo is not None:
-                created_at = created_at.replace(tzinfo=None)
-                
-            if created_at >= seven_days_ago:
-                day_key = created_at.strftime("%a")
-                weekly_data[day_key] += 1
+    week_start = datetime.now() - timedelta(days=6)
+    
+    weekly_rows = (
+        db.query(AppointmentDailyStat.day, stat_count)
+        .filter(AppointmentDailyStat.day >= week_start.date())
+        .group_by(AppointmentDailyStat.day)
+        .all()
+    )
+    for day, count in weekly_rows:
+        weekly_data[day.strftime("%a")] += count
     
     # Generate last 7 days
     days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
@@ -177,20 +196,22 @@ async def get_analytics_data(current_admin: Admin = Depends(get_current_admin),
         })
     
     # Doctor performance (top 5 by appointments)
-    doctor_stats = defaultdict(int)
-    for apt in all_appointments:
-        if apt.doctor_id:
-            doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
-            if doctor:
-                doctor_stats[doctor.name] += 1
+    doctor_rows = (
+        db.query(Doctor.name, stat_count)
+        .join(AppointmentDailyStat, AppointmentDailyStat.doctor_id == Doctor.id)
+        .group_by(Doctor.name)
+        .order_by(stat_count.desc())
+        .limit(5)
+        .all()
+    )
     
     doctor_performance = [
         {"doctor": name, "appointments": count}
-        for name, count in sorted(doctor_stats.items(), key=lambda x: x[1], reverse=True)[:5]
+        for name, count in doctor_rows
     ]
     
     # Appointment status counts
-    cancelled_appointments = db.query(func.count(Appointment.id)).filter(Appointment.status == "cancelled").scalar() or 0
+    cancelled_appointments = db.query(stat_count).filter(AppointmentDailyStat.status == "cancelled").scalar() or 0
     
     return {
         "success": True,
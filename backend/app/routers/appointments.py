@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List, Optional
-from app.database import get_db
-from app.models import Appointment, Doctor, Patient
+from app.database import get_async_db
+from app.models import Appointment, Doctor
+from app.patients import resolve_web_patient
 from app.schemas import AppointmentCreate, AppointmentStatusUpdate, AppointmentResponse
 from app.auth import get_current_admin
-from datetime import datetime
+from app.availability import availability, is_slot_conflict, slot_taken_error, held_by_other, to_day, to_time
+from app.responses import trusted_json
+from app.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from datetime import date, datetime
 
 router = APIRouter()
 
-def appointment_to_response(apt: Appointment, db: Session) -> dict:
-    doctor_name = None
-    if apt.doctor_id:
-        doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
-        if doctor:
-            doctor_name = doctor.name
+async def get_appointment_with_doctor(db: AsyncSession, appointment_id: int) -> Optional[Appointment]:
+    # Doctor is joined in so appointment_to_response never has to go back to the DB
+    result = await db.execute(
+        select(Appointment)
+        .options(joinedload(Appointment.doctor))
+        .where(Appointment.id == appointment_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+def appointment_to_response(apt: Appointment) -> dict:
+    # Expects apt.doctor to be eager-loaded (joinedload) by the caller
+    doctor_name = apt.doctor.name if apt.doctor else None
     
     return {
         "id": apt.id,
@@ -26,8 +40,8 @@ def appointment_to_response(apt: Appointment, db: Session) -> dict:
         "doctorId": apt.doctor_id,
         "doctorName": doctor_name,
         "specialization": apt.specialization,
-        "appointmentDate": apt.appointment_date,
-        "appointmentTime": apt.appointment_time,
+        "appointmentDate": apt.appointment_date.isoformat(),
+        "appointmentTime": apt.appointment_time.strftime("%H:%M"),
         "status": apt.status,
         "notes": apt.notes,
         "createdAt": apt.created_at
@@ -35,33 +49,67 @@ def appointment_to_response(apt: Appointment, db: Session) -> dict:
 
 @router.get("", response_model=List[AppointmentResponse])
 async def get_appointments(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: pending, confirmed, completed, cancelled"),
+    date_from: Optional[date] = Query(None, description="Appointment date on or after (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Appointment date on or before (YYYY-MM-DD)"),
+    doctor_id: Optional[int] = Query(None),
+    specialization: Optional[str] = Query(None),
+    patient_phone: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Appointment)
+    query = select(Appointment).options(joinedload(Appointment.doctor))
     
     if status:
-        query = query.filter(Appointment.status == status)
+        query = query.where(Appointment.status == status)
+    if date_from:
+        query = query.where(Appointment.appointment_date >= date_from)
+    if date_to:
+        query = query.where(Appointment.appointment_date <= date_to)
+    if doctor_id:
+        query = query.where(Appointment.doctor_id == doctor_id)
+    if specialization:
+        query = query.where(Appointment.specialization == specialization)
+    if patient_phone:
+        query = query.where(Appointment.patient_phone == patient_phone)
+    
+    # Keyset pagination: newest first, id breaks ties between equal timestamps
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Appointment.created_at, Appointment.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    # Fetch one extra row to know whether there is a next page
+    query = query.order_by(Appointment.created_at.desc(), Appointment.id.desc()).limit(limit + 1)
+    
+    result = await db.execute(query)
+    appointments = result.scalars().all()
     
-    appointments = query.order_by(Appointment.created_at.desc()).all()
-    return [appointment_to_response(apt, db) for apt in appointments]
+    if len(appointments) > limit:
+        appointments = appointments[:limit]
+        last = appointments[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    
+    return trusted_json([appointment_to_response(apt) for apt in appointments], AppointmentResponse, response)
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(
     appointment_id: int,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await get_appointment_with_doctor(db, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
-    return appointment_to_response(appointment, db)
+    return appointment_to_response(appointment)
 
 @router.post("", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def create_appointment(
     appointment_data: AppointmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Handle field name variations from frontend
     patient_name = appointment_data.patientName or appointment_data.patient_name
@@ -78,6 +126,10 @@ async def create_appointment(
         from datetime import datetime
         try:
             dt = datetime.fromisoformat(appointment_data.appointment_datetime.replace('Z', '+00:00'))
+            if dt.tzinfo is not None:
+                # Slots are clinic wall-clock times (server local time, as in availability);
+                # a UTC instant like "...T04:30:00Z" is the 10:00 slot in IST
+                dt = dt.astimezone()
             appointment_date = dt.strftime("%Y-%m-%d")
             appointment_time = dt.strftime("%H:%M")
         except:
@@ -92,7 +144,9 @@ async def create_appointment(
     doctor_id = appointment_data.doctorId
     if not doctor_id and appointment_data.doctor:
         # Try to find doctor by name
-        doctor = db.query(Doctor).filter(Doctor.name == appointment_data.doctor).first()
+        doctor = (await db.execute(
+            select(Doctor).where(Doctor.name == appointment_data.doctor)
+        )).scalars().first()
         if doctor:
             doctor_id = doctor.id
     
@@ -107,31 +161,30 @@ async def create_appointment(
         raise HTTPException(status_code=400, detail="Appointment date is required")
     if not appointment_time:
         raise HTTPException(status_code=400, detail="Appointment time is required")
+    try:
+        appointment_date = to_day(appointment_date)
+        appointment_time = to_time(appointment_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid appointment date (YYYY-MM-DD) or time (HH:MM)")
     
-    # Create or update patient record
-    patient = None
-    # Try to find existing patient by email or phone
-    if patient_email:
-        patient = db.query(Patient).filter(Patient.email == patient_email).first()
-    
-    if not patient and patient_phone:
-        # Try to find by phone
-        patient = db.query(Patient).filter(Patient.phone == patient_phone).first()
-    
-    if not patient:
-        # Create new patient (phone is required, email is optional)
-        patient = Patient(
-            name=patient_name,
-            email=patient_email if patient_email else None,
-            phone=patient_phone,
-            age=appointment_data.patientAge,
-            gender=appointment_data.patientGender
-        )
-        db.add(patient)
-        db.flush()
+    # Slot is being confirmed by a Telegram user right now
+    if held_by_other(doctor_id, appointment_date, appointment_time):
+        raise await slot_taken_error(db, doctor_id, appointment_date, appointment_time, booked=False)
+    
+    # Existing patient by email, then phone, else a new one - one upsert,
+    # committed together with the appointment
+    patient_id = await resolve_web_patient(
+        db,
+        name=patient_name,
+        phone=patient_phone,
+        email=patient_email or None,
+        age=appointment_data.patientAge,
+        gender=appointment_data.patientGender
+    )
     
     # Create appointment
     new_appointment = Appointment(
+        patient_id=patient_id,
         patient_name=patient_name,
         patient_email=patient_email,
         patient_phone=patient_phone,
@@ -145,13 +198,21 @@ async def create_appointment(
         notes=appointment_data.notes
     )
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not is_slot_conflict(e):
+            raise
+        raise await slot_taken_error(db, doctor_id, appointment_date, appointment_time)
+    availability.mark_booked(doctor_id, appointment_date, appointment_time)
+    # Reload with the doctor joined in (also picks up server defaults like created_at)
+    new_appointment = await get_appointment_with_doctor(db, new_appointment.id)
     
     return {
         "success": True,
         "message": "Appointment created successfully",
-        "appointment": appointment_to_response(new_appointment, db),
+        "appointment": appointment_to_response(new_appointment),
         "token": f"appt_{new_appointment.id}"  # Return a token for frontend compatibility
     }
 
@@ -160,9 +221,9 @@ async def update_appointment_status(
     appointment_id: int,
     status_data: AppointmentStatusUpdate,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await get_appointment_with_doctor(db, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
@@ -173,13 +234,28 @@ async def update_appointment_status(
             detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
         )
     
+    was_cancelled = appointment.status == "cancelled"
+    slot = (appointment.doctor_id, appointment.appointment_date, appointment.appointment_time)
     appointment.status = status_data.status
-    db.commit()
-    db.refresh(appointment)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        # Un-cancelling an appointment whose slot has been re-booked since
+        await db.rollback()
+        if not is_slot_conflict(e):
+            raise
+        raise await slot_taken_error(db, *slot)
+    
+    # Cancelling frees the slot, un-cancelling takes it again
+    if was_cancelled != (appointment.status == "cancelled"):
+        if was_cancelled:
+            availability.mark_booked(*slot)
+        else:
+            availability.mark_free(*slot)
     
     return {
         "success": True,
         "message": "Appointment status updated successfully",
-        "appointment": appointment_to_response(appointment, db)
+        "appointment": appointment_to_response(appointment)
     }
 
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Banner
 from app.schemas import BannerCreate, BannerUpdate, BannerResponse
 from app.auth import get_current_admin
+from app.etag import conditional
+from app.responses import trusted_json
 
 router = APIRouter()
 
@@ -23,8 +25,9 @@ def banner_to_response(banner: Banner) -> dict:
         "createdAt": banner.created_at
     }
 
-@router.get("", response_model=List[BannerResponse])
-async def get_banners(
+@router.get("", response_model=List[BannerResponse], dependencies=[Depends(conditional("banners"))])
+def get_banners(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: active"),
     db: Session = Depends(get_db)
 ):
@@ -34,17 +37,17 @@ async def get_banners(
         query = query.filter(Banner.is_active == True)
     
     banners = query.order_by(Banner.order.asc()).all()
-    return [banner_to_response(banner) for banner in banners]
+    return trusted_json([banner_to_response(banner) for banner in banners], BannerResponse, response)
 
-@router.get("/{banner_id}", response_model=BannerResponse)
-async def get_banner(banner_id: int, db: Session = Depends(get_db)):
+@router.get("/{banner_id}", response_model=BannerResponse, dependencies=[Depends(conditional("banners"))])
+def get_banner(banner_id: int, db: Session = Depends(get_db)):
     banner = db.query(Banner).filter(Banner.id == banner_id).first()
     if not banner:
         raise HTTPException(status_code=404, detail="Banner not found")
     return banner_to_response(banner)
 
 @router.post("", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def create_banner(
+def create_banner(
     banner_data: BannerCreate,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -72,7 +75,7 @@ async def create_banner(
     }
 
 @router.put("/{banner_id}", response_model=dict)
-async def update_banner(
+def update_banner(
     banner_id: int,
     banner_data: BannerUpdate,
     current_admin = Depends(get_current_admin),
@@ -109,7 +112,7 @@ async def update_banner(
     }
 
 @router.patch("/{banner_id}/toggle-active", response_model=dict)
-async def toggle_banner_active(
+def toggle_banner_active(
     banner_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -129,7 +132,7 @@ async def toggle_banner_active(
     }
 
 @router.delete("/{banner_id}", response_model=dict)
-async def delete_banner(
+def delete_banner(
     banner_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
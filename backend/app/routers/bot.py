@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Doctor, Appointment, Patient
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.database import get_async_db
+from app.models import Appointment
+from app.patients import upsert_telegram_patient
+from app.availability import availability, is_slot_conflict, slot_taken_error, held_by_other, is_past, to_day, to_time, to_slot
+from app.holds import get_hold_store, SLOT_HOLD_TTL_SECONDS
+from app.cache import doctor_directory
+from app.etag import conditional, register_static
 from datetime import datetime, timedelta
+from typing import List, Optional
+import calendar
 
 router = APIRouter(prefix="/api/bot", tags=["Telegram Bot"])
 
 # ===== GET ALL DOCTORS =====
 
-@router.get("/doctors")
-async def get_all_doctors(db: Session = Depends(get_db)):
+@router.get("/doctors", dependencies=[Depends(conditional("doctors"))])
+async def get_all_doctors(db: AsyncSession = Depends(get_async_db)):
     """Get all active doctors - for 'Our Doctors' menu"""
     try:
-        doctors = db.query(Doctor).filter(Doctor.is_active == True).all()
+        doctors = await doctor_directory.get_async(db, active_only=True)
         
         return [
             {
@@ -34,30 +44,33 @@ async def get_all_doctors(db: Session = Depends(get_db)):
 
 # ===== CLINIC INFORMATION =====
 
-@router.get("/clinic-info")
+CLINIC_INFO = {
+    "name": "Sree Sarojaa Multi Specialty Dental Clinic",
+    "address": "Near Vincent Bus Stop, Cherry Road\nKumaraswamypatti, Salem - 636007",
+    "phone": "0427 2313339",
+    "mobile": "8946088182",
+    "hours": {
+        "weekdays": "Monday - Friday: 8:00 AM - 8:00 PM",
+        "saturday": "Saturday: 9:00 AM - 5:00 PM",
+        "sunday": "Sunday: Closed"
+    },
+    "about": "We provide comprehensive, patient-friendly dental care with modern equipment and experienced specialists. Your smile is our priority!",
+    "maps_link": "https://maps.google.com/?q=Sree+Sarojaa+Multi+Specialty+Dental+Clinic+Salem"
+}
+register_static("clinic-info", CLINIC_INFO)
+
+@router.get("/clinic-info", dependencies=[Depends(conditional("clinic-info"))])
 async def get_clinic_info():
     """Get clinic information - for 'Hospital Information' menu"""
-    return {
-        "name": "Sree Sarojaa Multi Specialty Dental Clinic",
-        "address": "Near Vincent Bus Stop, Cherry Road\nKumaraswamypatti, Salem - 636007",
-        "phone": "0427 2313339",
-        "mobile": "8946088182",
-        "hours": {
-            "weekdays": "Monday - Friday: 8:00 AM - 8:00 PM",
-            "saturday": "Saturday: 9:00 AM - 5:00 PM",
-            "sunday": "Sunday: Closed"
-        },
-        "about": "We provide comprehensive, patient-friendly dental care with modern equipment and experienced specialists. Your smile is our priority!",
-        "maps_link": "https://maps.google.com/?q=Sree+Sarojaa+Multi+Specialty+Dental+Clinic+Salem"
-    }
+    return CLINIC_INFO
 
 
 # ===== DOCTORS BY SPECIALIZATION =====
 
-@router.get("/doctors/by-specialization")
+@router.get("/doctors/by-specialization", dependencies=[Depends(conditional("doctors"))])
 async def get_doctors_by_specialization(
     specialization: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get active doctors by specialization - for booking flow
     Restricted to Dr. K.P. Senthamarai Kannan and Dr. S. Vijayapriya as they are the only on-call doctors.
@@ -80,29 +93,23 @@ async def get_doctors_by_specialization(
                 "about": d.bio or "Experienced dental specialist"
             }
 
-        # 2. Find all doctors matching the specialization
         # 2. Find all doctors matching the specialization
         # First try exact match
-        matches = db.query(Doctor).filter(
-            Doctor.specialization == specialization,
-            Doctor.is_active == True
-        ).all()
+        matches = await doctor_directory.get_async(db, active_only=True, specialization=specialization)
         
         if not matches:
             # Try partial match
-            matches = db.query(Doctor).filter(
-                Doctor.specialization.ilike(f"%{specialization}%"),
-                Doctor.is_active == True
-            ).all()
+            needle = specialization.lower()
+            matches = [
+                d for d in await doctor_directory.get_async(db, active_only=True)
+                if needle in (d.specialization or "").lower()
+            ]
 
         if matches:
             return [format_doc(d) for d in matches]
             
         # 3. Fallback: If no doctor matches this specialization, return General Dentists
-        general_docs = db.query(Doctor).filter(
-            Doctor.specialization == "General Dentistry",
-            Doctor.is_active == True
-        ).all()
+        general_docs = await doctor_directory.get_async(db, active_only=True, specialization="General Dentistry")
         
         if general_docs:
             return [format_doc(d) for d in general_docs]
@@ -119,64 +126,117 @@ async def get_doctors_by_specialization(
 async def get_availability(
     doctor_id: str,
     date: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get available time slots for a doctor on a specific date"""
+    """Get available time slots for a doctor on a specific date
+    Served from the availability engine; Postgres is only read when the day isn't cached.
+    """
     try:
-        from datetime import datetime
-        
-        # Parse the date to check day of week
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        day_of_week = date_obj.weekday()  # 0=Monday, 6=Sunday
-        
-        # Debug logging
-        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        print(f"[AVAILABILITY] Date: {date}, Day: {day_names[day_of_week]} (weekday={day_of_week})")
-        
-        # Define time slots based on day
-        if day_of_week == 6:  # Sunday
-            # Clinic closed on Sunday
-            print(f"[AVAILABILITY] Sunday - clinic closed, returning empty slots")
-            return []
-        elif day_of_week == 5:  # Saturday
-            # Saturday: 9 AM - 5 PM (last appointment at 5 PM)
-            time_slots = [
-                "09:00", "10:00", "11:00", "12:00",
-                "14:00", "15:00", "16:00", "17:00"
-            ]
-        else:  # Monday-Friday
-            # Weekdays: 8 AM - 8 PM
-            time_slots = [
-                "08:00", "09:00", "10:00", "11:00", "12:00",
-                "14:00", "15:00", "16:00", "17:00", "18:00", "19:00", "20:00"
-            ]
-        
-        # Get existing appointments for this doctor on this date
-        appointments = db.query(Appointment).filter(
-            Appointment.doctor_id == int(doctor_id),
-            Appointment.appointment_date == date,
-            Appointment.status != "cancelled"
-        ).all()
-        
-        # Get booked times
-        booked_times = [apt.appointment_time for apt in appointments]
+        return await availability.get(db, int(doctor_id), date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/availability/range")
+async def get_availability_range(
+    month: str,
+    doctor_id: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Free-slot counts for every day of a month (YYYY-MM) - for calendar rendering
+    Pass doctor_id once per doctor (or comma separated); all doctors are read in one query.
+    """
+    try:
+        first_day = datetime.strptime(month, "%Y-%m").date()
+        doctor_ids = [int(part) for value in doctor_id or [] for part in value.split(",") if part]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM and doctor_id numeric")
+    if not doctor_ids:
+        raise HTTPException(status_code=400, detail="At least one doctor_id is required")
+    
+    try:
+        days_in_month = calendar.monthrange(first_day.year, first_day.month)[1]
+        days = [first_day + timedelta(days=offset) for offset in range(days_in_month)]
+        slots_by_doctor = await availability.get_range(db, doctor_ids, days)
         
-        # Return availability
-        return [
-            {
-                "time": slot,
-                "available": slot not in booked_times
+        return {
+            "month": month,
+            "doctors": {
+                str(doc_id): {
+                    day.isoformat(): {
+                        "slots": len(slots),
+                        "free": sum(1 for slot in slots if slot["available"])
+                    }
+                    for day, slots in slots_by_day.items()
+                }
+                for doc_id, slots_by_day in slots_by_doctor.items()
             }
-            for slot in time_slots
-        ]
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ===== SLOT HOLDS =====
+
+async def _bookable_doctor(db: AsyncSession, doctor_id: int, day, slot: str):
+    """Doctor for a hold or booking of (day, slot): 404 for an unknown doctor,
+    400 unless the slot is on the doctor's schedule and still ahead
+    """
+    doctor = next((d for d in await doctor_directory.get_async(db) if d.id == doctor_id), None)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if slot not in availability.slots_for(doctor_id, day):
+        raise HTTPException(status_code=400, detail="Not a bookable time slot")
+    if is_past(day, slot):
+        raise HTTPException(status_code=400, detail="This time slot has already passed")
+    return doctor
+
+@router.post("/holds", status_code=201)
+async def create_slot_hold(data: dict, db: AsyncSession = Depends(get_async_db)):
+    """Reserve a slot for SLOT_HOLD_TTL_SECONDS while the user confirms the booking"""
+    telegram_id = data.get("telegram_id")
+    if not telegram_id:
+        raise HTTPException(status_code=400, detail="telegram_id is required")
+    # Holders are strings; the bot may send the id as a JSON number
+    telegram_id = str(telegram_id)
+    try:
+        doctor_id = int(data["doctor_id"])
+        day = to_day(data["date"])
+        slot = to_slot(data["time"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="doctor_id, date (YYYY-MM-DD) and time (HH:MM) are required")
+    
+    await _bookable_doctor(db, doctor_id, day, slot)
+    slots = await availability.get(db, doctor_id, day, include_holds=False)
+    current = next(s for s in slots if s["time"] == slot)
+    if not current["available"]:
+        raise await slot_taken_error(db, doctor_id, day, slot)
+    
+    hold = get_hold_store().acquire((doctor_id, day, slot), telegram_id)
+    if hold is None:
+        raise await slot_taken_error(db, doctor_id, day, slot, booked=False)
+    
+    return {
+        "holdId": hold.id,
+        "doctorId": doctor_id,
+        "date": day.isoformat(),
+        "time": slot,
+        "expiresAt": datetime.utcfromtimestamp(hold.expires_at).isoformat() + "Z",
+        "ttlSeconds": SLOT_HOLD_TTL_SECONDS
+    }
+
+@router.delete("/holds/{hold_id}")
+async def release_slot_hold(hold_id: str):
+    """Give a held slot back (e.g. the user picked another time)"""
+    if not get_hold_store().release(hold_id):
+        raise HTTPException(status_code=404, detail="Hold not found or already expired")
+    return {"success": True}
+
+
 # ===== CREATE BOT APPOINTMENT =====
 
 @router.post("/appointments")
-async def create_bot_appointment(data: dict, db: Session = Depends(get_db)):
+async def create_bot_appointment(data: dict, db: AsyncSession = Depends(get_async_db)):
     """Create appointment from Telegram bot with patient management"""
     try:
         # 1. Extract data
@@ -185,86 +245,93 @@ async def create_bot_appointment(data: dict, db: Session = Depends(get_db)):
         
         if not telegram_id:
             raise HTTPException(status_code=400, detail="telegram_id is required")
+        # Same form as the holder of its slot hold (and the patients.telegram_id column)
+        telegram_id = str(telegram_id)
         
-        # 2. Create or update Patient
-        patient = db.query(Patient).filter(Patient.telegram_id == telegram_id).first()
+        try:
+            doctor_id = int(data["doctor_id"])
+            appointment_date = to_day(data["date"])
+            appointment_time = to_time(data["time"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="doctor_id, date (YYYY-MM-DD) and time (HH:MM) are required")
         
-        if not patient:
-            # Create new patient
-            patient = Patient(
-                telegram_id=telegram_id,
-                name=patient_data.get("name", "Telegram User"),
-                phone=patient_data.get("phone", "N/A"),
-                email=patient_data.get("email")
-            )
-            db.add(patient)
-            db.commit()
-            db.refresh(patient)
-        else:
-            # Update existing patient info if provided
-            if patient_data.get("name"):
-                patient.name = patient_data["name"]
-            if patient_data.get("phone"):
-                patient.phone = patient_data["phone"]
-            db.commit()
+        # 2. Get doctor details (from the directory cache - no query); same checks as a hold
+        doctor = await _bookable_doctor(db, doctor_id, appointment_date, to_slot(appointment_time))
         
-        # 3. Get doctor details
-        doctor_id = int(data["doctor_id"])
-        doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+        # Another user is confirming this slot right now
+        if held_by_other(doctor_id, appointment_date, appointment_time, holder=telegram_id):
+            raise await slot_taken_error(db, doctor_id, appointment_date, appointment_time, booked=False)
         
-        if not doctor:
-            raise HTTPException(status_code=404, detail="Doctor not found")
+        # 3. Create or update Patient - one upsert, committed with the appointment
+        patient_id, patient_name, patient_phone, patient_email = await upsert_telegram_patient(
+            db,
+            telegram_id,
+            name=patient_data.get("name"),
+            phone=patient_data.get("phone"),
+            email=patient_data.get("email")
+        )
         
         # 4. Create appointment
         appointment = Appointment(
             telegram_id=telegram_id,
-            patient_id=patient.id,
-            patient_name=patient.name,
-            patient_phone=patient.phone,
-            patient_email=patient.email,
+            patient_id=patient_id,
+            patient_name=patient_name,
+            patient_phone=patient_phone,
+            patient_email=patient_email,
             doctor_id=doctor.id,
             specialization=doctor.specialization,
-            appointment_date=data["date"],
-            appointment_time=data["time"],
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
             status="confirmed"  # Bot appointments are auto-confirmed
         )
         db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
+        await db.commit()
+        availability.mark_booked(appointment.doctor_id, appointment.appointment_date, appointment.appointment_time)
+        if data.get("hold_id"):
+            get_hold_store().release(data["hold_id"])
         
         # 5. Return bot-compatible format
         return {
             "token": f"APT{appointment.id:06d}",
-            "date": appointment.appointment_date,
-            "time": appointment.appointment_time,
+            "date": appointment.appointment_date.isoformat(),
+            "time": appointment.appointment_time.strftime("%H:%M"),
             "doctor": doctor.name,
             "doctor_id": doctor.id,
             "specialization": doctor.specialization,
-            "patient_name": patient.name
+            "patient_name": patient_name
         }
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        if not is_slot_conflict(e):
+            raise HTTPException(status_code=500, detail=str(e))
+        raise await slot_taken_error(db, doctor_id, appointment_date, appointment_time)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ===== GET USER APPOINTMENTS =====
 
 @router.get("/appointments/{telegram_id}")
-async def get_user_appointments(telegram_id: str, db: Session = Depends(get_db)):
+async def get_user_appointments(telegram_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get all appointments for a Telegram user"""
     try:
-        appointments = db.query(Appointment).filter(
+        appointments = (await db.execute(select(Appointment).options(
+            joinedload(Appointment.doctor)
+        ).where(
             Appointment.telegram_id == telegram_id,
             Appointment.status != "cancelled"
-        ).order_by(Appointment.appointment_date.desc()).all()
+        ).order_by(Appointment.appointment_date.desc(), Appointment.appointment_time.desc()))).scalars().all()
         
         result = []
         for apt in appointments:
-            doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
+            doctor = apt.doctor
             result.append({
                 "token": f"APT{apt.id:06d}",
-                "date": apt.appointment_date,
-                "time": apt.appointment_time,
+                "date": apt.appointment_date.isoformat(),
+                "time": apt.appointment_time.strftime("%H:%M"),
                 "doctor": doctor.name if doctor else "Unknown",
                 "doctor_id": apt.doctor_id,
                 "specialization": apt.specialization,
@@ -4,6 +4,7 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from app.database import get_db
 from app.models import Appointment, Doctor, Specialization
+from app.availability import availability
 from datetime import datetime
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
@@ -73,7 +74,7 @@ async def get_menu(chat_type: str):
 
 
 @router.post("/action")
-async def handle_action(action: ChatAction, db: Session = Depends(get_db)):
+def handle_action(action: ChatAction, db: Session = Depends(get_db)):
     """Handle chatbot actions"""
     
     # ===== POST-BOOKING ACTIONS =====
@@ -94,8 +95,8 @@ async def handle_action(action: ChatAction, db: Session = Depends(get_db)):
             doctor = db.query(Doctor).filter(Doctor.id == appointment.doctor_id).first()
             return ChatResponse(
                 message=f"📋 **Appointment Details**\n\n"
-                        f"🗓 Date: {appointment.appointment_date}\n"
-                        f"⏰ Time: {appointment.appointment_time}\n"
+                        f"🗓 Date: {appointment.appointment_date.isoformat()}\n"
+                        f"⏰ Time: {appointment.appointment_time.strftime('%H:%M')}\n"
                         f"👨‍⚕️ Doctor: {doctor.name if doctor else 'N/A'}\n"
                         f"🏥 Specialization: {appointment.specialization}\n"
                         f"📝 Status: {appointment.status.title()}\n"
@@ -116,8 +117,8 @@ async def handle_action(action: ChatAction, db: Session = Depends(get_db)):
         # Calendar link
         elif action.action == "calendar_link":
             # Generate Google Calendar link
-            date_str = appointment.appointment_date.replace("-", "")
-            time_str = appointment.appointment_time.replace(":", "") + "00"
+            date_str = appointment.appointment_date.strftime("%Y%m%d")
+            time_str = appointment.appointment_time.strftime("%H%M") + "00"
             start = f"{date_str}T{time_str}"
             end_hour = str(int(time_str[:2]) + 1).zfill(2)
             end = f"{date_str}T{end_hour}{time_str[2:]}"
@@ -151,6 +152,7 @@ async def handle_action(action: ChatAction, db: Session = Depends(get_db)):
         elif action.action == "cancel":
             appointment.status = "cancelled"
             db.commit()
+            availability.mark_free(appointment.doctor_id, appointment.appointment_date, appointment.appointment_time)
             return ChatResponse(
                 message="❌ Your appointment has been cancelled successfully.",
                 menu=None
@@ -240,7 +242,7 @@ async def handle_action(action: ChatAction, db: Session = Depends(get_db)):
 
 
 @router.post("/message")
-async def process_message(msg: ChatMessage, db: Session = Depends(get_db)):
+def process_message(msg: ChatMessage, db: Session = Depends(get_db)):
     """Process user text messages (basic responses)"""
     
     # For now, just return the menu
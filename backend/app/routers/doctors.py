@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Doctor
-from app.schemas import DoctorCreate, DoctorUpdate, DoctorResponse, DoctorListResponse
+from app.availability import availability
+from app.cache import doctor_directory
+from app.etag import conditional
+from app.responses import trusted_json
+from app.schemas import DoctorCreate, DoctorUpdate, DoctorResponse
 from app.auth import get_current_admin
-from datetime import datetime
 
 router = APIRouter()
 
-def doctor_to_response(doctor: Doctor) -> dict:
+def doctor_to_response(doctor) -> dict:
+    """Accepts a Doctor or a doctor_directory snapshot"""
     return {
         "id": doctor.id,
         "_id": str(doctor.id),  # Support both id and _id for frontend compatibility
@@ -27,27 +31,24 @@ def doctor_to_response(doctor: Doctor) -> dict:
         "image": doctor.image,
         "profilePicture": doctor.image,  # Alias for frontend compatibility
         "isActive": doctor.is_active,
-        "createdAt": doctor.created_at.isoformat() if doctor.created_at else None
+        "createdAt": doctor.created_at
     }
 
-@router.get("", response_model=List[DoctorResponse])
-@router.get("/all", response_model=List[DoctorResponse])
-async def get_doctors(
+@router.get("", response_model=List[DoctorResponse], dependencies=[Depends(conditional("doctors"))])
+@router.get("/all", response_model=List[DoctorResponse], dependencies=[Depends(conditional("doctors"))])
+def get_doctors(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: active"),
     active_only: Optional[bool] = Query(None, description="Filter active only"),
     specialization: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     try:
-        query = db.query(Doctor)
-        
-        if status == "active" or active_only:
-            query = query.filter(Doctor.is_active == True)
-        
-        if specialization:
-            query = query.filter(Doctor.specialization == specialization)
-        
-        doctors = query.all()
+        doctors = doctor_directory.get(
+            db,
+            active_only=bool(status == "active" or active_only),
+            specialization=specialization or None
+        )
 
         # RESTRICT BOOKINGS TO PRIMARY DOCTORS (Kannan & Vijayapriya)
         # If filtering by specialization (Booking flow), ensure only on-call doctors are returned.
@@ -64,17 +65,16 @@ async def get_doctors(
             else:
                 # If no primary doctor matches explicitly, default to Dr. Vijayapriya
                 # This catches cases like visiting specialists (Endodontist, Implantologist etc.)
-                default_doc = db.query(Doctor).filter(
-                    Doctor.name.ilike("%Vijayapriya%"),
-                    Doctor.is_active == True
-                ).first()
+                default_doc = next(
+                    (d for d in doctor_directory.get(db, active_only=True) if "vijayapriya" in d.name.lower()),
+                    None
+                )
                 if default_doc:
                     doctors = [default_doc]
                 else:
                     doctors = []
 
-        result = [doctor_to_response(doc) for doc in doctors]
-        return result
+        return trusted_json([doctor_to_response(doc) for doc in doctors], DoctorResponse, response)
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -82,15 +82,16 @@ async def get_doctors(
         print(error_details)
         raise HTTPException(status_code=500, detail=f"Error fetching doctors: {str(e)}")
 
-@router.get("/{doctor_id}", response_model=DoctorResponse)
-async def get_doctor(doctor_id: int, db: Session = Depends(get_db)):
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+@router.get("/{doctor_id}", response_model=DoctorResponse, dependencies=[Depends(conditional("doctors"))])
+def get_doctor(doctor_id: int, db: Session = Depends(get_db)):
+    # From the directory, like the listings, so the body matches its ETag
+    doctor = next((d for d in doctor_directory.get(db) if d.id == doctor_id), None)
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     return doctor_to_response(doctor)
 
 @router.post("", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def create_doctor(
+def create_doctor(
     doctor_data: DoctorCreate,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -125,6 +126,7 @@ async def create_doctor(
     db.add(new_doctor)
     db.commit()
     db.refresh(new_doctor)
+    doctor_directory.invalidate()
     
     return {
         "success": True,
@@ -133,7 +135,7 @@ async def create_doctor(
     }
 
 @router.put("/{doctor_id}", response_model=dict)
-async def update_doctor(
+def update_doctor(
     doctor_id: int,
     doctor_data: DoctorUpdate,
     current_admin = Depends(get_current_admin),
@@ -183,6 +185,7 @@ async def update_doctor(
     
     db.commit()
     db.refresh(doctor)
+    doctor_directory.invalidate()
     
     return {
         "success": True,
@@ -191,7 +194,7 @@ async def update_doctor(
     }
 
 @router.patch("/{doctor_id}/toggle-active", response_model=dict)
-async def toggle_doctor_active(
+def toggle_doctor_active(
     doctor_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -203,6 +206,7 @@ async def toggle_doctor_active(
     doctor.is_active = not doctor.is_active
     db.commit()
     db.refresh(doctor)
+    doctor_directory.invalidate()
     
     return {
         "success": True,
@@ -211,7 +215,7 @@ async def toggle_doctor_active(
     }
 
 @router.delete("/{doctor_id}", response_model=dict)
-async def delete_doctor(
+def delete_doctor(
     doctor_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -222,6 +226,8 @@ async def delete_doctor(
     
     db.delete(doctor)
     db.commit()
+    availability.invalidate(doctor_id)
+    doctor_directory.invalidate()
     
     return {
         "success": True,
@@ -1,122 +1,342 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Doctor, Patient, Appointment, Specialization, Banner
+from sqlalchemy import select, func
+from app.database import SessionLocal
+from app.models import Doctor, Patient, Appointment
 from app.auth import get_current_admin
-import io
+from app import reports
+from typing import Optional
+from functools import partial
+import asyncio
 import csv
-from datetime import datetime
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 router = APIRouter()
 
-@router.get("/excel")
-async def export_excel(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    """Export all data as CSV (Excel-compatible)"""
+# Rows are pulled from a server-side cursor in batches of this size and
+# flushed to the client as one chunk per batch
+EXPORT_BATCH_SIZE = 1000
+
+class _Echo:
+    """File-like object for csv.writer that hands back each formatted row"""
+    def write(self, value):
+        return value
+
+def _csv_section(db: Session, title: str, header: list, query):
+    """Yield one CSV section; the header row is only written if there are rows"""
+    writer = csv.writer(_Echo())
+    yield f"=== {title} ===\n"
+    result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    wrote_header = False
+    for batch in result.partitions():
+        chunk = [] if wrote_header else [writer.writerow(header)]
+        wrote_header = True
+        chunk.extend(writer.writerow(row) for row in batch)
+        yield "".join(chunk)
+    yield "\n"
+
+def _stream_export_csv():
+    # Own session: the stream outlives the request handler
+    db = SessionLocal()
     try:
-        output = io.StringIO()
-        
-        # Create CSV with all data
-        output.write("=== HOSPITAL DATA EXPORT ===\n")
-        output.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        yield "=== HOSPITAL DATA EXPORT ===\n"
+        yield f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         
-        # Export Doctors
-        output.write("=== DOCTORS ===\n")
-        doctors = db.query(Doctor).all()
-        if doctors:
-            writer = csv.writer(output)
-            writer.writerow(["ID", "Name", "Specialization", "Email", "Phone", "Experience", "Active"])
-            for doc in doctors:
-                writer.writerow([
-                    doc.id, doc.name, doc.specialization, doc.email or "", 
-                    doc.phone or "", doc.experience or 0, doc.is_active
-                ])
-        output.write("\n")
-        
-        # Export Patients
-        output.write("=== PATIENTS ===\n")
-        patients = db.query(Patient).all()
-        if patients:
-            writer = csv.writer(output)
-            writer.writerow(["ID", "Name", "Email", "Phone", "Age", "Gender"])
-            for patient in patients:
-                writer.writerow([
-                    patient.id, patient.name, patient.email, patient.phone,
-                    patient.age or "", patient.gender or ""
-                ])
-        output.write("\n")
+        yield from _csv_section(
+            db, "DOCTORS",
+            ["ID", "Name", "Specialization", "Email", "Phone", "Experience", "Active"],
+            select(
+                Doctor.id, Doctor.name, Doctor.specialization,
+                func.coalesce(Doctor.email, ""), func.coalesce(Doctor.phone, ""),
+                func.coalesce(Doctor.experience, 0), Doctor.is_active
+            ).order_by(Doctor.id)
+        )
         
-        # Export Appointments
-        output.write("=== APPOINTMENTS ===\n")
-        appointments = db.query(Appointment).all()
-        if appointments:
-            writer = csv.writer(output)
-            writer.writerow(["ID", "Patient", "Doctor", "Specialization", "Date", "Time", "Status"])
-            for apt in appointments:
-                doctor_name = ""
-                if apt.doctor_id:
-                    doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
-                    if doctor:
-                        doctor_name = doctor.name
-                writer.writerow([
-                    apt.id, apt.patient_name, doctor_name, apt.specialization,
-                    apt.appointment_date, apt.appointment_time, apt.status
-                ])
+        yield from _csv_section(
+            db, "PATIENTS",
+            ["ID", "Name", "Email", "Phone", "Age", "Gender"],
+            select(
+                Patient.id, Patient.name, Patient.email, Patient.phone,
+                Patient.age, Patient.gender
+            ).order_by(Patient.id)
+        )
         
-        # Prepare response
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=hospital_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            }
+        # Doctor name comes from the join - no per-row lookup
+        yield from _csv_section(
+            db, "APPOINTMENTS",
+            ["ID", "Patient", "Doctor", "Specialization", "Date", "Time", "Status"],
+            select(
+                Appointment.id, Appointment.patient_name, func.coalesce(Doctor.name, ""),
+                Appointment.specialization, Appointment.appointment_date,
+                func.to_char(Appointment.appointment_time, "HH24:MI"), Appointment.status
+            ).outerjoin(Doctor, Appointment.doctor_id == Doctor.id).order_by(Appointment.id)
+        )
+    finally:
+        db.close()
+
+@router.get("/excel")
+async def export_excel(current_admin = Depends(get_current_admin)):
+    """Export all data as CSV (Excel-compatible), streamed as it is read"""
+    return StreamingResponse(
+        _stream_export_csv(),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=hospital_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        }
+    )
+
+
+# ===== COLUMNAR (PARQUET / ARROW) EXPORT =====
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+# (file name, arrow schema, query) - query columns must follow schema order
+def _columnar_tables():
+    return [
+        (
+            "doctors",
+            pa.schema([
+                ("id", pa.int32()), ("name", pa.string()), ("specialization", pa.string()),
+                ("email", pa.string()), ("phone", pa.string()), ("experience", pa.int32()),
+                ("qualification", pa.string()), ("consultation_fee", pa.float64()),
+                ("is_active", pa.bool_()), ("created_at", TIMESTAMP),
+            ]),
+            select(
+                Doctor.id, Doctor.name, Doctor.specialization, Doctor.email, Doctor.phone,
+                Doctor.experience, Doctor.qualification, Doctor.consultation_fee,
+                Doctor.is_active, Doctor.created_at
+            ).order_by(Doctor.id),
+        ),
+        (
+            "patients",
+            pa.schema([
+                ("id", pa.int32()), ("telegram_id", pa.string()), ("name", pa.string()),
+                ("email", pa.string()), ("phone", pa.string()), ("age", pa.int32()),
+                ("gender", pa.string()), ("blood_group", pa.string()), ("created_at", TIMESTAMP),
+            ]),
+            select(
+                Patient.id, Patient.telegram_id, Patient.name, Patient.email, Patient.phone,
+                Patient.age, Patient.gender, Patient.blood_group, Patient.created_at
+            ).order_by(Patient.id),
+        ),
+        (
+            "appointments",
+            pa.schema([
+                ("id", pa.int32()), ("patient_id", pa.int32()), ("telegram_id", pa.string()),
+                ("patient_name", pa.string()), ("patient_phone", pa.string()),
+                ("doctor_id", pa.int32()), ("doctor_name", pa.string()),
+                ("specialization", pa.string()), ("appointment_date", pa.date32()),
+                ("appointment_time", pa.time32("ms")), ("status", pa.string()),
+                ("created_at", TIMESTAMP),
+            ]),
+            select(
+                Appointment.id, Appointment.patient_id, Appointment.telegram_id,
+                Appointment.patient_name, Appointment.patient_phone, Appointment.doctor_id,
+                Doctor.name, Appointment.specialization, Appointment.appointment_date,
+                Appointment.appointment_time, Appointment.status, Appointment.created_at
+            ).outerjoin(Doctor, Appointment.doctor_id == Doctor.id).order_by(Appointment.id),
+        ),
+    ]
+
+def _write_columnar_table(db: Session, path: str, fmt: str, schema, query):
+    """Write one table batch by batch straight from the DB cursor"""
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+    finally:
+        writer.close()
+
+def _build_columnar_export(fmt: str) -> str:
+    """Build the zip in a temp file and return its path (runs in a worker thread)"""
+    extension = COLUMNAR_FORMATS[fmt]
+    db = SessionLocal()
+    workdir = tempfile.mkdtemp(prefix="hospital_export_")
+    try:
+        archive_path = os.path.join(workdir, "export.zip")
+        # Files are already compressed column by column - store them as-is
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for name, schema, query in _columnar_tables():
+                table_path = os.path.join(workdir, name + extension)
+                _write_columnar_table(db, table_path, fmt, schema, query)
+                archive.write(table_path, arcname=name + extension)
+                os.remove(table_path)
+        return archive_path
+    except Exception:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    finally:
+        db.close()
+
+@router.get("/columnar")
+async def export_columnar(
+    format: str = Query("parquet", description="parquet or arrow (Arrow IPC file)"),
+    current_admin = Depends(get_current_admin)
+):
+    """Export doctors, patients and appointments as typed columnar files in a zip"""
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(COLUMNAR_FORMATS)}"
         )
+    try:
+        archive_path = await run_in_threadpool(_build_columnar_export, format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return FileResponse(
+        archive_path,
+        media_type="application/zip",
+        filename=f"hospital_data_{format}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+        background=BackgroundTask(shutil.rmtree, os.path.dirname(archive_path), ignore_errors=True)
+    )
 
 
-@router.get("/pdf")
-async def export_pdf(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    """Export data summary as text (PDF generation requires additional libraries)"""
+# ===== PDF SUMMARY REPORT =====
+
+def _collect_summary(start: Optional[date], end: Optional[date]) -> dict:
+    """Gather everything the report shows as plain data (runs in a worker thread)"""
+    db = SessionLocal()
     try:
-        # For now, return a text summary
-        # To implement actual PDF, you'd need to install: pip install reportlab
-        
-        output = io.StringIO()
+        window = []
+        if start:
+            window.append(Appointment.appointment_date >= start)
+        if end:
+            window.append(Appointment.appointment_date <= end)
         
-        output.write("=" * 60 + "\n")
-        output.write("HOSPITAL DATA SUMMARY\n")
-        output.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.write("=" * 60 + "\n\n")
+        doctor_counts = db.execute(select(
+            func.count(Doctor.id),
+            func.count(Doctor.id).filter(Doctor.is_active == True)
+        )).one()
+        total_patients = db.execute(select(func.count(Patient.id))).scalar() or 0
+        appointment_counts = db.execute(select(
+            func.count(Appointment.id),
+            func.count(Appointment.id).filter(Appointment.status == "pending"),
+            func.count(Appointment.id).filter(Appointment.status == "confirmed"),
+            func.count(Appointment.id).filter(Appointment.status == "completed"),
+            func.count(Appointment.id).filter(Appointment.status == "cancelled")
+        ).where(*window)).one()
         
-        # Statistics
-        total_doctors = db.query(Doctor).count()
-        active_doctors = db.query(Doctor).filter(Doctor.is_active == True).count()
-        total_patients = db.query(Patient).count()
-        total_appointments = db.query(Appointment).count()
-        pending_appointments = db.query(Appointment).filter(Appointment.status == "pending").count()
+        appointment_count = func.count(Appointment.id)
+        doctors = db.execute(
+            select(Doctor.name, appointment_count)
+            .join(Appointment, Appointment.doctor_id == Doctor.id)
+            .where(*window)
+            .group_by(Doctor.name)
+            .order_by(appointment_count.desc())
+        ).all()
         
-        output.write("STATISTICS\n")
-        output.write("-" * 60 + "\n")
-        output.write(f"Total Doctors: {total_doctors} (Active: {active_doctors})\n")
-        output.write(f"Total Patients: {total_patients}\n")
-        output.write(f"Total Appointments: {total_appointments} (Pending: {pending_appointments})\n\n")
+        recent = db.execute(
+            select(
+                Appointment.appointment_date, Appointment.appointment_time,
+                Appointment.patient_name, func.coalesce(Doctor.name, "-"), Appointment.status
+            )
+            .outerjoin(Doctor, Appointment.doctor_id == Doctor.id)
+            .where(*window)
+            .order_by(Appointment.created_at.desc())
+            .limit(10)
+        ).all()
         
-        # Recent Appointments
-        output.write("RECENT APPOINTMENTS (Last 10)\n")
-        output.write("-" * 60 + "\n")
-        recent = db.query(Appointment).order_by(Appointment.created_at.desc()).limit(10).all()
-        for apt in recent:
-            output.write(f"{apt.appointment_date} {apt.appointment_time} - {apt.patient_name} - {apt.status}\n")
-        
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/plain",
-            headers={
-                "Content-Disposition": f"attachment; filename=hospital_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            }
-        )
+        total, pending, confirmed, completed, cancelled = appointment_counts
+        return {
+            "period": f"{start.isoformat() if start else 'beginning'} to {end.isoformat() if end else 'today'}",
+            "generated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "statistics": [
+                ("Total Doctors", f"{doctor_counts[0]} (Active: {doctor_counts[1]})"),
+                ("Total Patients", str(total_patients)),
+                ("Total Appointments", str(total)),
+                ("Pending", str(pending)),
+                ("Confirmed", str(confirmed)),
+                ("Completed", str(completed)),
+                ("Cancelled", str(cancelled)),
+            ],
+            "doctors": [(name, str(count)) for name, count in doctors],
+            "recent": [
+                (day.isoformat(), slot.strftime("%H:%M"), patient, doctor, status or "pending")
+                for day, slot, patient, doctor, status in recent
+            ],
+        }
+    finally:
+        db.close()
+
+def _validate_window(start: Optional[date], end: Optional[date]):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+
+def _report_handle(report_id: str, ready: bool) -> dict:
+    return {
+        "success": True,
+        "reportId": report_id,
+        "status": "ready" if ready else "pending",
+        "downloadUrl": f"/api/admin/export/pdf/reports/{report_id}"
+    }
+
+def _pdf_file(path: str, report_id: str) -> FileResponse:
+    return FileResponse(path, media_type="application/pdf", filename=f"hospital_{report_id}.pdf")
+
+@router.post("/pdf/reports", status_code=202)
+async def request_pdf_report(
+    start: Optional[date] = Query(None, description="First appointment date included (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Last appointment date included (YYYY-MM-DD)"),
+    current_admin = Depends(get_current_admin)
+):
+    """Start rendering a summary PDF in the background and return its download handle"""
+    _validate_window(start, end)
+    report_id = reports.report_id_for(start, end)
+    task = reports.start_report(report_id, partial(_collect_summary, start, end))
+    return _report_handle(report_id, ready=task is None)
+
+@router.get("/pdf/reports/{report_id}")
+async def download_pdf_report(report_id: str, current_admin = Depends(get_current_admin)):
+    """Download a requested report, or 202 while it is still rendering"""
+    try:
+        start, end = reports.parse_report_id(report_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    path = reports.cached_report(report_id)
+    if path:
+        return _pdf_file(path, report_id)
+    error = reports.pop_failure(report_id)
+    if error:
+        raise HTTPException(status_code=500, detail=f"Report generation failed: {error}")
+    
+    # Not rendered yet (or expired / requested on another worker) - (re)start it
+    reports.start_report(report_id, partial(_collect_summary, start, end))
+    return JSONResponse(status_code=202, content=_report_handle(report_id, ready=False))
+
+@router.get("/pdf")
+async def export_pdf(
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    current_admin = Depends(get_current_admin)
+):
+    """Export data summary as PDF (waits for the render without blocking the worker)"""
+    _validate_window(start, end)
+    report_id = reports.report_id_for(start, end)
+    task = reports.start_report(report_id, partial(_collect_summary, start, end))
+    try:
+        path = await asyncio.shield(task) if task else reports.report_path(report_id)
     except Exception as e:
+        reports.pop_failure(report_id)
         raise HTTPException(status_code=500, detail=str(e))
+    return _pdf_file(path, report_id)
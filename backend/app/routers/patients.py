@@ -1,37 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, case, or_, text
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, List, Optional
 from app.database import get_db
-from app.models import Patient, Appointment, Doctor
-from app.schemas import PatientResponse
+from app.models import Patient, Appointment
+from app.schemas import PatientResponse, PatientSummaryResponse, AppointmentResponse
 from app.auth import get_current_admin
+from app.responses import trusted_json
+from app.pagination import encode_id_cursor, decode_id_cursor, NEXT_CURSOR_HEADER, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.routers.appointments import appointment_to_response
+from datetime import date
+import re
 
 router = APIRouter()
 
-def patient_to_response(patient: Patient, db: Session) -> dict:
-    # Get patient appointments
-    appointments_query = db.query(Appointment).filter(
-        (Appointment.patient_email == patient.email) | 
-        (Appointment.patient_phone == patient.phone)
-    ).all()
-    
-    appointments = []
-    for apt in appointments_query:
-        doctor_name = None
-        if apt.doctor_id:
-            doctor = db.query(Doctor).filter(Doctor.id == apt.doctor_id).first()
-            if doctor:
-                doctor_name = doctor.name
-        
-        appointments.append({
-            "id": apt.id,
-            "doctorName": doctor_name,
-            "specialization": apt.specialization,
-            "date": apt.appointment_date,
-            "time": apt.appointment_time,
-            "status": apt.status
-        })
-    
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Shorter name fragments have no trigram to use, so they would scan the table
+MIN_NAME_FRAGMENT = 3
+PHONE_QUERY = re.compile(r"^\+?[\d\s-]+$")
+# Shorter phone prefixes match a large share of the table
+MIN_PHONE_DIGITS = 4
+# The order of the varchar_pattern_ops index (byte order, whatever the database
+# collation): the prefix range is read in index order and stops at the limit.
+# An exact match is the smallest string with its prefix, so it comes first.
+PHONE_INDEX_ORDER = text("patients.phone USING ~<~")
+
+def appointment_summary(apt: Appointment) -> dict:
+    return {
+        "id": apt.id,
+        "doctorName": apt.doctor.name if apt.doctor else None,
+        "specialization": apt.specialization,
+        "date": apt.appointment_date.isoformat(),
+        "time": apt.appointment_time.strftime("%H:%M"),
+        "status": apt.status
+    }
+
+def patient_fields(patient: Patient) -> dict:
     return {
         "id": patient.id,
         "name": patient.name,
@@ -44,20 +49,119 @@ def patient_to_response(patient: Patient, db: Session) -> dict:
         "emergencyContact": patient.emergency_contact,
         "medicalHistory": patient.medical_history,
         "allergies": patient.allergies,
-        "appointments": appointments,
         "createdAt": patient.created_at
     }
 
-@router.get("", response_model=List[PatientResponse])
-async def get_patients(
+def patient_summaries(patients: List[Patient], db: Session) -> List[dict]:
+    """Listing rows with appointment count and last date - one grouped query for all of them"""
+    counts: Dict[int, int] = {}
+    last_dates: Dict[int, date] = {}
+    if patients:
+        rows = db.query(
+            Appointment.patient_id, func.count(Appointment.id), func.max(Appointment.appointment_date)
+        ).filter(
+            Appointment.patient_id.in_([patient.id for patient in patients])
+        ).group_by(Appointment.patient_id).all()
+        for patient_id, count, last_date in rows:
+            counts[patient_id] = count
+            last_dates[patient_id] = last_date
+    return [
+        {
+            **patient_fields(patient),
+            "appointmentCount": counts.get(patient.id, 0),
+            "lastAppointmentDate": last_dates[patient.id].isoformat() if patient.id in last_dates else None
+        }
+        for patient in patients
+    ]
+
+def patient_history(patient: Patient, db: Session) -> List[Appointment]:
+    # Doctor is joined in so the response never has to go back to the DB
+    return (
+        db.query(Appointment)
+        .options(joinedload(Appointment.doctor))
+        .filter(Appointment.patient_id == patient.id)
+        .order_by(Appointment.appointment_date.desc(), Appointment.appointment_time.desc())
+        .all()
+    )
+
+@router.get("", response_model=List[PatientSummaryResponse])
+def get_patients(
+    response: Response,
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    current_admin = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Patients, newest first, each with an appointment count and last appointment date"""
+    # Keyset pagination on the primary key
+    query = db.query(Patient)
+    if cursor:
+        query = query.filter(Patient.id < decode_id_cursor(cursor))
+    # Fetch one extra row to know whether there is a next page
+    patients = query.order_by(Patient.id.desc()).limit(limit + 1).all()
+
+    if len(patients) > limit:
+        patients = patients[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_id_cursor(patients[-1].id)
+
+    return trusted_json(patient_summaries(patients, db), PatientSummaryResponse, response)
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@router.get("/search", response_model=List[PatientSummaryResponse])
+def search_patients(
+    q: str = Query(..., min_length=1, max_length=100, description="Phone prefix, name fragment or Telegram ID"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    patients = db.query(Patient).all()
-    return [patient_to_response(patient, db) for patient in patients]
+    """Best matches first: exact Telegram ID, then phones with the prefix (exact
+    phone first) - or, for other terms, name prefix, name word prefix, then any
+    name containing the fragment (shortest names first).
+    """
+    term = q.strip()
+    if not term:
+        raise HTTPException(status_code=400, detail="Search term is required")
+    pattern = _like_escape(term)
+
+    # Phone-like terms only look at telegram_id and phones (names never contain
+    # digits), each an index lookup that stops at the limit
+    if PHONE_QUERY.match(term):
+        patients = db.query(Patient).filter(Patient.telegram_id == term).limit(1).all()
+        if sum(ch.isdigit() for ch in term) >= MIN_PHONE_DIGITS:
+            by_phone = (
+                db.query(Patient)
+                .filter(Patient.phone.like(f"{pattern}%", escape="\\"))
+                .order_by(PHONE_INDEX_ORDER)
+                .limit(limit)
+                .all()
+            )
+            patients += [patient for patient in by_phone if patient not in patients]
+        return trusted_json(patient_summaries(patients[:limit], db), PatientSummaryResponse)
+
+    # Both branches are served by an index: telegram_id (unique) and name
+    # (pg_trgm GIN) - Postgres ORs the bitmaps
+    conditions = [Patient.telegram_id == term]
+    ranks = [(Patient.telegram_id == term, 0)]
+    if len(term) >= MIN_NAME_FRAGMENT:
+        conditions.append(Patient.name.ilike(f"%{pattern}%", escape="\\"))
+        ranks += [
+            (Patient.name.ilike(f"{pattern}%", escape="\\"), 1),
+            (Patient.name.ilike(f"% {pattern}%", escape="\\"), 2),
+        ]
+
+    patients = (
+        db.query(Patient)
+        .filter(or_(*conditions))
+        .order_by(case(*ranks, else_=3), func.length(Patient.name), Patient.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return trusted_json(patient_summaries(patients, db), PatientSummaryResponse)
 
 @router.get("/{patient_id}", response_model=PatientResponse)
-async def get_patient(
+def get_patient(
     patient_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -65,5 +169,22 @@ async def get_patient(
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
-    return patient_to_response(patient, db)
+    return {
+        **patient_fields(patient),
+        "appointments": [appointment_summary(apt) for apt in patient_history(patient, db)]
+    }
 
+@router.get("/{patient_id}/appointments", response_model=List[AppointmentResponse])
+def get_patient_appointments(
+    patient_id: int,
+    current_admin = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """A patient's appointment history, newest first"""
+    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return trusted_json(
+        [appointment_to_response(apt) for apt in patient_history(patient, db)],
+        AppointmentResponse
+    )
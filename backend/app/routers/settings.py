@@ -49,7 +49,7 @@ async def get_admin_profile(current_admin: Admin = Depends(get_current_admin)):
 
 # Update admin profile
 @router.put("/profile")
-async def update_admin_profile(
+def update_admin_profile(
     profile_data: AdminProfileUpdate,
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -82,7 +82,7 @@ async def update_admin_profile(
 
 # Change password
 @router.post("/change-password")
-async def change_password(
+def change_password(
     password_data: PasswordChange,
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Specialization
 from app.schemas import SpecializationCreate, SpecializationUpdate, SpecializationResponse
 from app.auth import get_current_admin
+from app.etag import conditional
+from app.responses import trusted_json
 
 router = APIRouter()
 
@@ -19,9 +21,10 @@ def specialization_to_response(spec: Specialization) -> dict:
         "createdAt": spec.created_at
     }
 
-@router.get("", response_model=List[SpecializationResponse])
-@router.get("/all", response_model=List[SpecializationResponse])
-async def get_specializations(
+@router.get("", response_model=List[SpecializationResponse], dependencies=[Depends(conditional("specializations"))])
+@router.get("/all", response_model=List[SpecializationResponse], dependencies=[Depends(conditional("specializations"))])
+def get_specializations(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: active"),
     active_only: Optional[bool] = Query(None, description="Filter active only"),
     db: Session = Depends(get_db)
@@ -32,22 +35,22 @@ async def get_specializations(
         query = query.filter(Specialization.is_active == True)
     
     specializations = query.all()
-    return [specialization_to_response(spec) for spec in specializations]
+    return trusted_json([specialization_to_response(spec) for spec in specializations], SpecializationResponse, response)
 
-@router.get("/active", response_model=List[SpecializationResponse])
-async def get_active_specializations(db: Session = Depends(get_db)):
+@router.get("/active", response_model=List[SpecializationResponse], dependencies=[Depends(conditional("specializations"))])
+def get_active_specializations(response: Response, db: Session = Depends(get_db)):
     specializations = db.query(Specialization).filter(Specialization.is_active == True).all()
-    return [specialization_to_response(spec) for spec in specializations]
+    return trusted_json([specialization_to_response(spec) for spec in specializations], SpecializationResponse, response)
 
-@router.get("/{spec_id}", response_model=SpecializationResponse)
-async def get_specialization(spec_id: int, db: Session = Depends(get_db)):
+@router.get("/{spec_id}", response_model=SpecializationResponse, dependencies=[Depends(conditional("specializations"))])
+def get_specialization(spec_id: int, db: Session = Depends(get_db)):
     spec = db.query(Specialization).filter(Specialization.id == spec_id).first()
     if not spec:
         raise HTTPException(status_code=404, detail="Specialization not found")
     return specialization_to_response(spec)
 
 @router.post("", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def create_specialization(
+def create_specialization(
     spec_data: SpecializationCreate,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -77,7 +80,7 @@ async def create_specialization(
     }
 
 @router.put("/{spec_id}", response_model=dict)
-async def update_specialization(
+def update_specialization(
     spec_id: int,
     spec_data: SpecializationUpdate,
     current_admin = Depends(get_current_admin),
@@ -114,7 +117,7 @@ async def update_specialization(
     }
 
 @router.patch("/{spec_id}/toggle-active", response_model=dict)
-async def toggle_specialization_active(
+def toggle_specialization_active(
     spec_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -134,7 +137,7 @@ async def toggle_specialization_active(
     }
 
 @router.delete("/{spec_id}", response_model=dict)
-async def delete_specialization(
+def delete_specialization(
     spec_id: int,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
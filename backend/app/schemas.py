@@ -167,6 +167,23 @@ class PatientResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PatientSummaryResponse(BaseModel):
+    # Listing row - the appointment history is at /api/patients/{id}/appointments
+    id: int
+    name: str
+    email: str
+    phone: str
+    age: Optional[int]
+    gender: Optional[str]
+    bloodGroup: Optional[str]
+    address: Optional[str]
+    emergencyContact: Optional[str]
+    medicalHistory: Optional[str]
+    allergies: Optional[str]
+    appointmentCount: int = 0
+    lastAppointmentDate: Optional[str] = None
+    createdAt: Optional[datetime] = None
+
 # Banner Schemas
 class BannerCreate(BaseModel):
     title: Optional[str] = ""
@@ -1,16 +1,29 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.auth import get_current_admin
+from app.database import pool_status
+from app.responses import FastJSONResponse
+from app.compression import CompressionMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
+from app.idempotency import IdempotencyMiddleware
+from app import rollups  # registers the appointment rollup flush listeners
+from app import reports
 from app.routers import admin, doctors, specializations, appointments, patients, banners, settings, export, chat, bot, upload
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic (migrations/); run `alembic upgrade head` before starting
 
-app = FastAPI(title="Hospital Management System API", version="1.0.0")
+app = FastAPI(
+    title="Hospital Management System API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse
+)
+
+# Repeated booking POSTs (same Idempotency-Key) get the first response back
+app.add_middleware(IdempotencyMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -19,8 +32,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the admin dashboard read the keyset pagination cursor
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# brotli/gzip for JSON lists and CSV exports (streamed exports are compressed chunk by chunk)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(doctors.router, prefix="/api/doctors", tags=["Doctors"])
@@ -34,6 +52,10 @@ app.include_router(chat.router)
 app.include_router(bot.router)
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
 
+@app.on_event("shutdown")
+async def shutdown():
+    reports.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Hospital Management System API", "status": "running"}
@@ -42,3 +64,7 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+# Pool internals are for operators only
+@app.get("/metrics", dependencies=[Depends(get_current_admin)])
+async def metrics():
+    return {"database": pool_status()}
@@ -0,0 +1,24 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.database import DATABASE_URL, Base
+import app.models  # noqa: F401 - registers every table on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_online() -> None:
+    # Own short-lived engine: migrations must not hold on to the app's pool
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    # The revisions inspect the live schema (tables left by create_all, column types)
+    raise SystemExit("Offline (--sql) mode is not supported; run against the database")
+run_migrations_online()
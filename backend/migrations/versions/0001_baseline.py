@@ -0,0 +1,140 @@
+"""Baseline schema (the tables main.py used to create with create_all)
+
+Databases that were created by create_all already have these tables; they are
+left alone, so `alembic upgrade head` works for new and existing databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["admins", "specializations", "doctors", "patients", "appointments", "banners"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "admins" not in existing:
+        op.create_table(
+            "admins",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("email", sa.String(100), nullable=False),
+            sa.Column("password", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_admins_id", "admins", ["id"])
+        op.create_index("ix_admins_email", "admins", ["email"], unique=True)
+
+    if "specializations" not in existing:
+        op.create_table(
+            "specializations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False, unique=True),
+            sa.Column("description", sa.Text()),
+            sa.Column("icon", sa.String(50)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_specializations_id", "specializations", ["id"])
+
+    if "doctors" not in existing:
+        op.create_table(
+            "doctors",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("specialization", sa.String(100), nullable=False),
+            sa.Column("email", sa.String(100)),
+            sa.Column("phone", sa.String(20)),
+            sa.Column("experience", sa.Integer()),
+            sa.Column("qualification", sa.String(200), nullable=False),
+            sa.Column("consultation_fee", sa.Float()),
+            sa.Column("opd_timings", sa.String(100)),
+            sa.Column("languages", sa.JSON()),
+            sa.Column("bio", sa.Text()),
+            sa.Column("image", sa.String(500)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("specialization_id", sa.Integer(), sa.ForeignKey("specializations.id")),
+        )
+        op.create_index("ix_doctors_id", "doctors", ["id"])
+        op.create_index("ix_doctors_email", "doctors", ["email"], unique=True)
+
+    if "patients" not in existing:
+        op.create_table(
+            "patients",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("telegram_id", sa.String(50)),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("email", sa.String(100)),
+            sa.Column("phone", sa.String(20), nullable=False),
+            sa.Column("age", sa.Integer()),
+            sa.Column("gender", sa.String(20)),
+            sa.Column("blood_group", sa.String(10)),
+            sa.Column("address", sa.Text()),
+            sa.Column("emergency_contact", sa.String(100)),
+            sa.Column("medical_history", sa.Text()),
+            sa.Column("allergies", sa.Text()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_patients_id", "patients", ["id"])
+        op.create_index("ix_patients_telegram_id", "patients", ["telegram_id"], unique=True)
+        op.create_index("ix_patients_email", "patients", ["email"], unique=True)
+        op.create_index("ix_patients_phone", "patients", ["phone"], unique=True)
+
+    if "appointments" not in existing:
+        op.create_table(
+            "appointments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("telegram_id", sa.String(50)),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id")),
+            sa.Column("patient_name", sa.String(100), nullable=False),
+            sa.Column("patient_email", sa.String(100)),
+            sa.Column("patient_phone", sa.String(20), nullable=False),
+            sa.Column("patient_age", sa.Integer()),
+            sa.Column("patient_gender", sa.String(20)),
+            sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("doctors.id")),
+            sa.Column("specialization", sa.String(100), nullable=False),
+            sa.Column("appointment_date", sa.String(20), nullable=False),
+            sa.Column("appointment_time", sa.String(20), nullable=False),
+            sa.Column("status", sa.String(20)),
+            sa.Column("notes", sa.Text()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_appointments_id", "appointments", ["id"])
+        op.create_index("ix_appointments_telegram_id", "appointments", ["telegram_id"])
+        op.create_index("ix_appointments_patient_email", "appointments", ["patient_email"])
+
+    if "banners" not in existing:
+        op.create_table(
+            "banners",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(200)),
+            sa.Column("description", sa.Text()),
+            sa.Column("image", sa.String(500)),
+            sa.Column("link", sa.String(500)),
+            sa.Column("button_text", sa.String(100)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("order", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_banners_id", "banners", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_table(table)
@@ -0,0 +1,41 @@
+"""Appointment indexes for the admin listing, dashboard and exports
+
+create_all never adds indexes to a table that already exists, so these are
+created here with IF NOT EXISTS and show up on old databases too.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # Keyset pagination order for the admin listing (created_at DESC, id DESC)
+    ("ix_appointments_created_at_id", ["created_at", "id"]),
+    ("ix_appointments_status_created_at", ["status", "created_at"]),
+    ("ix_appointments_specialization_date", ["specialization", "appointment_date"]),
+    # Patient lookup by phone (bot bookings, patient summaries)
+    ("ix_appointments_patient_phone", ["patient_phone"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in INDEXES:
+        op.create_index(name, "appointments", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="appointments", if_exists=True)
@@ -0,0 +1,52 @@
+"""Daily appointment rollups for the dashboard
+
+Creates appointment_daily_stats and fills it from the existing appointments;
+from then on app/rollups.py keeps it up to date on every flush.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_SQL = """
+    INSERT INTO appointment_daily_stats (day, doctor_id, specialization, status, count)
+    SELECT CAST(created_at AS DATE), COALESCE(doctor_id, 0), specialization,
+           COALESCE(status, 'pending'), COUNT(*)
+    FROM appointments
+    WHERE created_at IS NOT NULL
+    GROUP BY CAST(created_at AS DATE), COALESCE(doctor_id, 0), specialization, COALESCE(status, 'pending')
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("appointment_daily_stats"):
+        op.create_table(
+            "appointment_daily_stats",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("doctor_id", sa.Integer(), primary_key=True),
+            sa.Column("specialization", sa.String(100), primary_key=True),
+            sa.Column("status", sa.String(20), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+    # Only backfill an empty table - rows already there are live counters
+    if bind.execute(sa.text("SELECT 1 FROM appointment_daily_stats LIMIT 1")).first() is None:
+        op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("appointment_daily_stats")
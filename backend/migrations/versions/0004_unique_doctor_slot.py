@@ -0,0 +1,57 @@
+"""One live appointment per doctor slot
+
+Partial unique index over (doctor_id, appointment_date, appointment_time) that
+ignores cancelled appointments. Fails with the offending rows listed if the
+table already holds double bookings.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "uq_appointments_doctor_slot"
+LIVE = sa.text("status <> 'cancelled'")
+
+DUPLICATES_SQL = sa.text("""
+    SELECT doctor_id, appointment_date, appointment_time, COUNT(*) AS live
+    FROM appointments
+    WHERE doctor_id IS NOT NULL AND status <> 'cancelled'
+    GROUP BY doctor_id, appointment_date, appointment_time
+    HAVING COUNT(*) > 1
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    duplicates = op.get_bind().execute(DUPLICATES_SQL).all()
+    if duplicates:
+        listed = "\n".join(
+            f"  doctor_id={row.doctor_id} date={row.appointment_date} time={row.appointment_time} ({row.live} live)"
+            for row in duplicates
+        )
+        raise RuntimeError(
+            "These slots are booked more than once; cancel the extra appointments "
+            f"and run the upgrade again:\n{listed}"
+        )
+    op.create_index(
+        INDEX_NAME, "appointments", ["doctor_id", "appointment_date", "appointment_time"],
+        unique=True, postgresql_where=LIVE, sqlite_where=LIVE, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX_NAME, table_name="appointments", if_exists=True)
+
@@ -0,0 +1,131 @@
+"""Native DATE/TIME appointment columns
+
+appointment_date VARCHAR -> DATE and appointment_time VARCHAR -> TIME
+(PostgreSQL parses 'HH:MM', 'HH:MM:SS' and '9:00 AM' style values), then swaps
+the doctor/day and Telegram user indexes for ones that cover the new sort keys.
+Refuses to run, listing the rows, if any value cannot be converted (bad
+format or impossible dates like 2024-02-30) or if two live bookings of a slot
+only become the same slot once converted ('9:00' and '09:00'), which the
+one-live-appointment-per-slot index from 0004 would reject mid-way.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REPLACED_INDEXES = [
+    ("ix_appointments_doctor_date", ["doctor_id", "appointment_date"]),
+    ("ix_appointments_telegram_id", ["telegram_id"]),
+]
+NEW_INDEXES = [
+    # Doctor schedule / availability range scans
+    ("ix_appointments_doctor_date_time", ["doctor_id", "appointment_date", "appointment_time"]),
+    # "My appointments" for a Telegram user, newest first
+    ("ix_appointments_telegram_date", ["telegram_id", "appointment_date"]),
+]
+
+# Try the cast itself, so anything the ALTER would choke on is caught here
+CASTS_SQL = [
+    sa.text(f"""
+        CREATE FUNCTION pg_temp.casts_to_{type_}(value text) RETURNS boolean AS $$
+        BEGIN
+            PERFORM value::{type_};
+            RETURN true;
+        EXCEPTION WHEN others THEN
+            RETURN false;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for type_ in ("date", "time")
+]
+
+BAD_ROWS_SQL = sa.text(r"""
+    SELECT id, appointment_date, appointment_time FROM appointments
+    WHERE appointment_date !~ '^\d{4}-\d{2}-\d{2}$'
+       OR appointment_time !~* '^\d{1,2}:\d{2}(:\d{2})?\s*([ap]m)?$'
+       OR NOT pg_temp.casts_to_date(appointment_date)
+       OR NOT pg_temp.casts_to_time(appointment_time)
+    ORDER BY id
+""")
+
+# Same grouping as the 0004 unique index, on the converted values
+DUPLICATES_SQL = sa.text("""
+    SELECT doctor_id, appointment_date::date AS day, appointment_time::time AS slot,
+           string_agg(id::text || ' (' || appointment_time || ')', ', ' ORDER BY id) AS ids
+    FROM appointments
+    WHERE doctor_id IS NOT NULL AND status <> 'cancelled'
+    GROUP BY doctor_id, appointment_date::date, appointment_time::time
+    HAVING COUNT(*) > 1
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {
+        column["name"]: column["type"]
+        for column in sa.inspect(op.get_bind()).get_columns("appointments")
+    }
+    if not isinstance(columns["appointment_date"], sa.Date):
+        bind = op.get_bind()
+        for statement in CASTS_SQL:
+            bind.execute(statement)
+        bad_rows = bind.execute(BAD_ROWS_SQL).all()
+        if bad_rows:
+            listed = "\n".join(
+                f"  id={row.id} date={row.appointment_date!r} time={row.appointment_time!r}"
+                for row in bad_rows
+            )
+            raise RuntimeError(
+                f"{len(bad_rows)} appointment(s) have a date/time that cannot be converted; "
+                f"fix or delete them and run the upgrade again:\n{listed}"
+            )
+        duplicates = bind.execute(DUPLICATES_SQL).all()
+        if duplicates:
+            listed = "\n".join(
+                f"  doctor_id={row.doctor_id} date={row.day} time={row.slot}: appointments {row.ids}"
+                for row in duplicates
+            )
+            raise RuntimeError(
+                "These slots end up booked more than once after conversion; "
+                f"cancel the extra appointments and run the upgrade again:\n{listed}"
+            )
+        op.alter_column(
+            "appointments", "appointment_date",
+            type_=sa.Date(), postgresql_using="appointment_date::date"
+        )
+        op.alter_column(
+            "appointments", "appointment_time",
+            type_=sa.Time(), postgresql_using="appointment_time::time"
+        )
+
+    for name, _ in REPLACED_INDEXES:
+        op.drop_index(name, table_name="appointments", if_exists=True)
+    for name, columns in NEW_INDEXES:
+        op.create_index(name, "appointments", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _ in reversed(NEW_INDEXES):
+        op.drop_index(name, table_name="appointments", if_exists=True)
+    op.alter_column(
+        "appointments", "appointment_time",
+        type_=sa.String(20), postgresql_using="to_char(appointment_time, 'HH24:MI')"
+    )
+    op.alter_column(
+        "appointments", "appointment_date",
+        type_=sa.String(20), postgresql_using="to_char(appointment_date, 'YYYY-MM-DD')"
+    )
+    op.create_index("ix_appointments_telegram_id", "appointments", ["telegram_id"], if_not_exists=True)
@@ -0,0 +1,49 @@
+"""Link every appointment to its patient
+
+Web bookings used to be saved without patient_id, so patient history had to
+be matched on email/phone strings. This links the existing rows the same way
+the booking endpoint finds a patient (email first, then phone) and indexes
+patient_id so a patient's history is a single index probe.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BY_EMAIL = """
+    UPDATE appointments SET patient_id = patients.id
+    FROM patients
+    WHERE appointments.patient_id IS NULL
+      AND appointments.patient_email IS NOT NULL
+      AND appointments.patient_email = patients.email
+"""
+BACKFILL_BY_PHONE = """
+    UPDATE appointments SET patient_id = patients.id
+    FROM patients
+    WHERE appointments.patient_id IS NULL
+      AND appointments.patient_phone = patients.phone
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(BACKFILL_BY_EMAIL)
+    op.execute(BACKFILL_BY_PHONE)
+    op.create_index("ix_appointments_patient_id", "appointments", ["patient_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The links themselves are kept - they are correct data either way
+    op.drop_index("ix_appointments_patient_id", table_name="appointments", if_exists=True)
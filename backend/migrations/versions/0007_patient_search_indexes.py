@@ -0,0 +1,55 @@
+"""Indexes for the patient search endpoint
+
+- ix_patients_phone_prefix: btree with varchar_pattern_ops, so phone LIKE 'prefix%'
+  is an index range scan whatever the database collation
+- ix_patients_name_trgm: GIN trigram index (pg_trgm), so name ILIKE '%fragment%'
+  does not scan the table
+
+pg_trgm ships with PostgreSQL's contrib package and is a trusted extension, so
+the database owner can create it. If the server does not have it the trigram
+index is skipped with a warning - search still works, name matches just scan.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_patients_phone_prefix", "patients", ["phone"],
+        postgresql_ops={"phone": "varchar_pattern_ops"}, if_not_exists=True
+    )
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if available is None:
+        log.warning("pg_trgm is not available on this server; skipping ix_patients_name_trgm")
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_patients_name_trgm", "patients", ["name"],
+        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_patients_name_trgm", table_name="patients", if_exists=True)
+    op.drop_index("ix_patients_phone_prefix", table_name="patients", if_exists=True)
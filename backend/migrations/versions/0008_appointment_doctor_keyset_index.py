@@ -0,0 +1,34 @@
+"""Index for the admin appointment listing filtered by doctor
+
+GET /api/appointments?doctor_id= walks the keyset (created_at DESC, id DESC)
+for one doctor; with (doctor_id, created_at, id) every page is a range scan
+that stops at the page size instead of sorting all of the doctor's rows.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_appointments_doctor_created_at_id", "appointments", ["doctor_id", "created_at", "id"],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_appointments_doctor_created_at_id", table_name="appointments", if_exists=True)
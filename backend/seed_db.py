@@ -5,9 +5,11 @@ import os
 sys.path.append(os.getcwd())
 
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine, Base
+from app.database import SessionLocal
 from app.models import Admin, Doctor, Specialization, Banner
 from passlib.context import CryptContext
+from alembic import command
+from alembic.config import Config
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -214,8 +216,8 @@ def seed_data():
 if __name__ == "__main__":
     print("Starting database seed...")
     try:
-        # Create tables if they don't exist (just in case)
-        Base.metadata.create_all(bind=engine)
+        # Create/upgrade the schema first (same as `alembic upgrade head`)
+        command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
         seed_data()
     except Exception as e:
         print(f"Fatal error: {e}")
@@ -3,6 +3,8 @@ echo Starting Hospital Management System Backend...
 echo.
 echo Make sure PostgreSQL is running and the database is set up.
 echo.
+echo Applying database migrations...
+alembic upgrade head || exit /b 1
 uvicorn main:app --reload --host 0.0.0.0 --port 8000
 pause
 
@@ -5,5 +5,8 @@ echo ""
 echo "Make sure PostgreSQL is running and the database is set up."
 echo ""
 
+echo "Applying database migrations..."
+alembic upgrade head || exit 1
+
 uvicorn main:app --reload --host 0.0.0.0 --port 8000
 
@@ -2,6 +2,7 @@ import os
 import calendar
 import httpx
 import asyncio
+import uuid
 from datetime import date, timedelta, datetime
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import A4
@@ -42,6 +43,15 @@ async def api_post(path, data):
         except:
             return None
 
+async def api_post_status(path, data, headers=None):
+    """POST that also returns the status code, so 4xx bodies can be shown to the user"""
+    async with httpx.AsyncClient(timeout=15) as c:
+        try:
+            r = await c.post(API_BASE + path, json=data, headers=headers)
+            return r.status_code, r.json()
+        except:
+            return None, None
+
 async def api_patch(path, data):
     async with httpx.AsyncClient(timeout=15) as c:
         try:
@@ -213,7 +223,23 @@ def main_menu():
         [InlineKeyboardButton("☎️ Contact Us", callback_data="menu_contact")]
     ])
 
-def build_calendar(year, month, doctor_id):
+async def fetch_available_dates(year, month, doctor_id):
+    """Dates in the month that still have a free slot (None if the API is unreachable)"""
+    data = await api_get("/api/bot/availability/range", {
+        "month": f"{year}-{month:02d}",
+        "doctor_id": doctor_id
+    })
+    if not data:
+        return None
+    days = data["doctors"].get(str(doctor_id), {})
+    return {day for day, counts in days.items() if counts["free"] > 0}
+
+async def calendar_markup(year, month, doctor_id):
+    """Month calendar with closed and fully booked days greyed out (one API call)"""
+    available_dates = await fetch_available_dates(year, month, doctor_id)
+    return build_calendar(year, month, doctor_id, available_dates)
+
+def build_calendar(year, month, doctor_id, available_dates=None):
     cal = calendar.Calendar()
     today = date.today()
     last = today + timedelta(days=365)
@@ -230,7 +256,8 @@ def build_calendar(year, month, doctor_id):
 
     week = []
     for d in cal.itermonthdates(year, month):
-        if d.month != month or d < today or d > last:
+        unavailable = available_dates is not None and d.isoformat() not in available_dates
+        if d.month != month or d < today or d > last or unavailable:
             week.append(InlineKeyboardButton("❌", callback_data="ignore"))
         else:
             week.append(InlineKeyboardButton(
@@ -564,7 +591,7 @@ async def handle_issue(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"✅ Assigned to *Dr. {d['name']}* ({d['qualification']})\n"
             f"📅 *Select Appointment Date:*",
             parse_mode="Markdown",
-            reply_markup=build_calendar(today.year, today.month, d['id'])
+            reply_markup=await calendar_markup(today.year, today.month, d['id'])
         )
 
 
@@ -603,7 +630,29 @@ async def doctor_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     today = date.today()
     await q.edit_message_text(
         f"📅 Select date for Dr. {name}",
-        reply_markup=build_calendar(today.year, today.month, did)
+        reply_markup=await calendar_markup(today.year, today.month, did)
+    )
+
+async def release_hold(context):
+    hold_id = context.user_data.pop("hold_id", None)
+    if hold_id:
+        await api_delete(f"/api/bot/holds/{hold_id}")
+
+async def slot_taken_reply(q, context, detail):
+    """Someone else got the slot first - offer the next free ones"""
+    alternatives = detail.get("alternatives", []) if isinstance(detail, dict) else []
+    y_str, m_str, _ = context.user_data["date"].split("-")
+    kb = [
+        [InlineKeyboardButton(f"{a['date']} {a['time']}", callback_data=f"slot|{a['time']}|{a['date']}")]
+        for a in alternatives
+    ]
+    kb.append([InlineKeyboardButton("🔙 Back to Calendar", callback_data=f"nav|{y_str}|{m_str}|{context.user_data['doctor_id']}")])
+    await q.edit_message_text(
+        "⚠️ *Slot just taken*\n\n"
+        "Sorry, someone else is booking this time.\n"
+        + ("Here are the next free slots:" if alternatives else "Please pick another date."),
+        reply_markup=InlineKeyboardMarkup(kb),
+        parse_mode="Markdown"
     )
 
 async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -617,10 +666,11 @@ async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             m, y = 12, y - 1
         if m > 12:
             m, y = 1, y + 1
-        await q.edit_message_reply_markup(build_calendar(y, m, d))
+        await q.edit_message_reply_markup(await calendar_markup(y, m, d))
         return
 
     if parts[0] == "date":
+        await release_hold(context)
         context.user_data["date"] = parts[2]
         context.user_data["doctor_id"] = parts[1] # Fix: Store doctor_id for later use
         doctor_id = parts[1]
@@ -667,7 +717,10 @@ async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         await q.edit_message_text("⏰ *Select appointment time:*", reply_markup=InlineKeyboardMarkup(kb), parse_mode="Markdown")
 
-    elif parts[0] == "slot":
+    elif parts[0] in ("slot", "book"):
+        # Alternatives offered after a conflict carry their own date: slot|HH:MM|YYYY-MM-DD
+        if parts[0] == "slot" and len(parts) == 3:
+            context.user_data["date"] = parts[2]
         # Check context validity (handle restart/session loss)
         if "date" not in context.user_data or "doctor_id" not in context.user_data:
              await q.answer("⚠️ Session expired. Please start over.", show_alert=True)
@@ -678,7 +731,7 @@ async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
              )
              return
 
-        if "reschedule_token" in context.user_data:
+        if parts[0] == "slot" and "reschedule_token" in context.user_data:
             token = context.user_data.pop("reschedule_token")
             await api_patch(f"/appointments/{token}/reschedule", {
                 "date": context.user_data["date"],
@@ -688,6 +741,41 @@ async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await q.edit_message_text("✅ Appointment rescheduled.", reply_markup=main_menu())
             return
 
+        if parts[0] == "slot":
+            # Reserve the slot while the user confirms, so it isn't lost at the last step
+            await release_hold(context)
+            status, res = await api_post_status("/api/bot/holds", {
+                "doctor_id": context.user_data["doctor_id"],
+                "date": context.user_data["date"],
+                "time": parts[1],
+                "telegram_id": str(update.effective_user.id)
+            })
+            if status == 409:
+                await slot_taken_reply(q, context, res["detail"])
+                return
+            if status != 201 or not res:
+                await q.edit_message_text(
+                    "❌ Could not reserve this slot. Please try again.",
+                    reply_markup=main_menu()
+                )
+                return
+
+            context.user_data["hold_id"] = res["holdId"]
+            # Sent with every Confirm attempt for this slot, so a retry or a
+            # redelivered callback returns the first booking instead of a second one
+            context.user_data["booking_key"] = uuid.uuid4().hex
+            await q.edit_message_text(
+                f"🕐 *{context.user_data['date']} at {parts[1]}*\n\n"
+                f"This slot is reserved for you for {res['ttlSeconds'] // 60} minutes.\n"
+                f"Tap *Confirm* to book it.",
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("✅ Confirm Booking", callback_data=f"book|{parts[1]}")],
+                    [InlineKeyboardButton("🔁 Change Time", callback_data=f"date|{context.user_data['doctor_id']}|{context.user_data['date']}")]
+                ]),
+                parse_mode="Markdown"
+            )
+            return
+
         # Create appointment with patient data
         patient_data = {
             "telegram_id": str(update.effective_user.id),
@@ -698,12 +786,30 @@ async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "gender": context.user_data.get("patient_gender")
         }
         
-        res = await api_post("/api/bot/appointments", {
+        booking_key = context.user_data.get("booking_key")
+        status, res = await api_post_status("/api/bot/appointments", {
             "patient_data": patient_data,
             "date": context.user_data["date"],
             "time": parts[1],
-            "doctor_id": context.user_data["doctor_id"]
-        })
+            "doctor_id": context.user_data["doctor_id"],
+            "hold_id": context.user_data.get("hold_id")
+        }, headers={"Idempotency-Key": booking_key} if booking_key else None)
+
+        if status is not None:
+            # Answered - the hold is used up (or gone) either way; keep both for a retry otherwise
+            context.user_data.pop("hold_id", None)
+            context.user_data.pop("booking_key", None)
+
+        if status == 409:
+            await slot_taken_reply(q, context, res["detail"])
+            return
+
+        if status != 200 or not res:
+            await q.edit_message_text(
+                "❌ Could not book the appointment. Please try again.",
+                reply_markup=main_menu()
+            )
+            return
 
         pdf = generate_pdf(res)
         context.user_data["pdf"] = pdf
@@ -775,7 +881,7 @@ async def manage_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         today = date.today()
         await q.edit_message_text(
             "📅 Select new date:",
-            reply_markup=build_calendar(today.year, today.month, appt["doctor_id"])
+            reply_markup=await calendar_markup(today.year, today.month, appt["doctor_id"])
         )
 
     elif action == "cancel":
@@ -854,7 +960,7 @@ def main():
     app.add_handler(CallbackQueryHandler(menu_handler, pattern="^menu_"))
     app.add_handler(CallbackQueryHandler(gender_handler, pattern=r"^gender\|"))
     app.add_handler(CallbackQueryHandler(doctor_handler, pattern=r"^doctor\|"))
-    app.add_handler(CallbackQueryHandler(calendar_handler, pattern=r"^(nav\||date\||slot\|)"))
+    app.add_handler(CallbackQueryHandler(calendar_handler, pattern=r"^(nav\||date\||slot\||book\|)"))
     app.add_handler(CallbackQueryHandler(manage_handler, pattern=r"^(view|cancel|pdf|remind|resch)"))
 
     print("🤖 Hosbot running")
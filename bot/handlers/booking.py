@@ -23,7 +23,8 @@ from utils import (
     validate_age,
     get_issue_label,
     get_gender_label,
-    cleanup_old_messages
+    cleanup_old_messages,
+    available_dates_from_range
 )
 import httpx
 from datetime import date
@@ -299,7 +300,11 @@ async def handle_doctor_selection(update: Update, context: ContextTypes.DEFAULT_
         "📅 *Select appointment date:*"
     )
     
-    calendar = build_calendar_keyboard(today.year, today.month, doctor_id)
+    range_data = await api_get(
+        f"/api/bot/availability/range?month={today.year}-{today.month:02d}&doctor_id={doctor_id}"
+    )
+    available_dates = available_dates_from_range(range_data, doctor_id)
+    calendar = build_calendar_keyboard(today.year, today.month, doctor_id, available_dates)
     await query.edit_message_text(text, reply_markup=calendar, parse_mode="Markdown")
     
     return BotState.BOOKING_DATE
@@ -12,7 +12,7 @@ from keyboards import (
     build_calendar_keyboard,
     time_slots_keyboard
 )
-from utils import edit_or_send, format_appointment_details
+from utils import edit_or_send, format_appointment_details, available_dates_from_range
 import httpx
 from datetime import date
 
@@ -110,7 +110,11 @@ async def handle_reschedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Select new date:"
     )
     
-    calendar = build_calendar_keyboard(today.year, today.month, appt['doctor_id'])
+    range_data = await api_get(
+        f"/api/bot/availability/range?month={today.year}-{today.month:02d}&doctor_id={appt['doctor_id']}"
+    )
+    available_dates = available_dates_from_range(range_data, appt['doctor_id'])
+    calendar = build_calendar_keyboard(today.year, today.month, appt['doctor_id'], available_dates)
     await query.edit_message_text(text, reply_markup=calendar, parse_mode="Markdown")
     
     return BotState.RESCHEDULE_DATE
@@ -135,7 +135,9 @@ def appointments_list_keyboard(appointments):
 
 
 def build_calendar_keyboard(year, month, doctor_id, available_dates=None):
-    """Calendar keyboard for date selection"""
+    """Calendar keyboard for date selection
+    available_dates: set of "YYYY-MM-DD" with a free slot; other days are greyed out
+    """
     import calendar
     from datetime import date, timedelta
     
@@ -162,6 +164,9 @@ def build_calendar_keyboard(year, month, doctor_id, available_dates=None):
                 if current_date < today:
                     # Past date
                     row.append(InlineKeyboardButton("✖️", callback_data="ignore"))
+                elif available_dates is not None and current_date.strftime("%Y-%m-%d") not in available_dates:
+                    # Closed or fully booked
+                    row.append(InlineKeyboardButton("✖️", callback_data="ignore"))
                 else:
                     # Future date
                     date_str = current_date.strftime("%Y-%m-%d")
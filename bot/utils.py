@@ -183,3 +183,11 @@ def get_issue_label(callback_data: str) -> str:
 def get_gender_label(callback_data: str) -> str:
     """Get display label for gender callback data"""
     return GENDER_LABELS.get(callback_data, callback_data)
+
+
+def available_dates_from_range(range_data, doctor_id):
+    """Dates with a free slot from /api/bot/availability/range (None if not loaded)"""
+    if not range_data:
+        return None
+    days = range_data.get("doctors", {}).get(str(doctor_id), {})
+    return {day for day, counts in days.items() if counts["free"] > 0}
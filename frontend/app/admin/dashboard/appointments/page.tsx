@@ -7,18 +7,24 @@ import { Card } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
 import { Search, CalendarIcon, Filter, Grid, List, ChevronLeft, ChevronRight, Plus } from "lucide-react"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
-import { api } from "@/lib/api"
-import type { Appointment, Doctor, Patient } from "@/lib/types"
+import { api, createAppointment, SlotTakenError } from "@/lib/api"
+import type { SlotAlternative } from "@/lib/api"
+import type { Appointment, Doctor } from "@/lib/types"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription, DialogFooter } from "@/components/ui/dialog"
 import { Tabs, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { useToast } from "@/hooks/use-toast"
 import { Label } from "@/components/ui/label"
 
+const PAGE_SIZE = 50
+// Largest page the API serves; used to fetch a whole month for the calendar
+const MAX_PAGE_SIZE = 500
+
 export default function AppointmentsPage() {
   const [appointments, setAppointments] = useState<Appointment[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [doctors, setDoctors] = useState<Doctor[]>([])
-  const [patients, setPatients] = useState<Patient[]>([])
   const [searchTerm, setSearchTerm] = useState("")
   const [selectedStatus, setSelectedStatus] = useState<string>("all")
   const [viewMode, setViewMode] = useState<"table" | "calendar">("table")
@@ -40,6 +46,8 @@ export default function AppointmentsPage() {
     appointmentDate: "",
     appointmentTime: "",
   })
+  // 409 slot_taken from the add dialog: the message and the next free slots to pick from
+  const [slotTaken, setSlotTaken] = useState<{ message: string; alternatives: SlotAlternative[] } | null>(null)
   const { toast } = useToast()
 
   const [stats, setStats] = useState({
@@ -49,36 +57,63 @@ export default function AppointmentsPage() {
   })
 
   useEffect(() => {
-    loadAppointments()
+    loadStats()
     loadDoctors()
-    loadPatients()
   }, [])
 
-  const loadDoctors = async () => {
+  useEffect(() => {
+    loadAppointments()
+  }, [viewMode, selectedStatus, currentDate.getFullYear(), currentDate.getMonth()])
+
+  const loadStats = async () => {
     try {
-      const data = await api.getDoctors()
-      setDoctors(Array.isArray(data) ? data : [])
+      const data = await api.getStats()
+      setStats({
+        total: data.stats.totalAppointments,
+        pending: data.stats.pendingAppointments,
+        confirmed: data.stats.confirmedAppointments,
+      })
     } catch (error) {
-      console.error("Failed to fetch doctors:", error)
+      console.error("Failed to fetch appointment stats:", error)
     }
   }
 
-  const loadPatients = async () => {
+  const loadDoctors = async () => {
     try {
-      const data = await api.getPatients()
-      setPatients(Array.isArray(data) ? data : [])
+      const data = await api.getDoctors()
+      setDoctors(Array.isArray(data) ? data : [])
     } catch (error) {
-      console.error("Failed to fetch patients:", error)
+      console.error("Failed to fetch doctors:", error)
     }
   }
 
+  // The table pages through the listing (newest first); the calendar loads only the month it shows
   const loadAppointments = async () => {
     try {
       setLoading(true)
-      const data = await api.getAppointments()
-      const appointmentsArray = Array.isArray(data) ? data : []
-      setAppointments(appointmentsArray)
-      calculateStats(appointmentsArray)
+      const status = selectedStatus === "all" ? undefined : selectedStatus
+      if (viewMode === "calendar") {
+        const { year, month, daysInMonth } = getDaysInMonth(currentDate)
+        const monthAppointments: Appointment[] = []
+        let cursor: string | undefined
+        do {
+          const page = await api.getAppointments({
+            status,
+            date_from: formatCalendarDate(year, month, 1),
+            date_to: formatCalendarDate(year, month, daysInMonth),
+            limit: MAX_PAGE_SIZE,
+            cursor,
+          })
+          monthAppointments.push(...page.items)
+          cursor = page.nextCursor ?? undefined
+        } while (cursor)
+        setAppointments(monthAppointments)
+        setNextCursor(null)
+      } else {
+        const page = await api.getAppointments({ status, limit: PAGE_SIZE })
+        setAppointments(page.items)
+        setNextCursor(page.nextCursor)
+      }
     } catch (error: any) {
       console.error("Failed to fetch appointments:", error)
       toast({
@@ -87,11 +122,35 @@ export default function AppointmentsPage() {
         variant: "destructive",
       })
       setAppointments([])
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }
 
+  const loadMoreAppointments = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const page = await api.getAppointments({
+        status: selectedStatus === "all" ? undefined : selectedStatus,
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      })
+      setAppointments((prev) => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (error: any) {
+      console.error("Failed to fetch more appointments:", error)
+      toast({
+        title: "Error",
+        description: error.message || "Failed to fetch appointments",
+        variant: "destructive",
+      })
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleAddAppointment = async () => {
     try {
       // Validate required fields
@@ -118,19 +177,9 @@ export default function AppointmentsPage() {
         appointmentTime: newAppointment.appointmentTime,
       }
 
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"}/api/appointments`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify(appointmentData),
-      })
-
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}))
-        throw new Error(errorData.detail || "Failed to create appointment")
-      }
+      await createAppointment(appointmentData)
 
+      setSlotTaken(null)
       toast({
         title: "Success",
         description: "Appointment created successfully",
@@ -148,8 +197,12 @@ export default function AppointmentsPage() {
         appointmentDate: "",
         appointmentTime: "",
       })
-      await loadAppointments()
+      await Promise.all([loadAppointments(), loadStats()])
     } catch (error: any) {
+      if (error instanceof SlotTakenError) {
+        setSlotTaken({ message: error.message, alternatives: error.alternatives })
+        return
+      }
       console.error("Failed to create appointment:", error)
       toast({
         title: "Error",
@@ -159,14 +212,6 @@ export default function AppointmentsPage() {
     }
   }
 
-  const calculateStats = (data: Appointment[]) => {
-    setStats({
-      total: data.length,
-      pending: data.filter((a) => a.status === "pending").length,
-      confirmed: data.filter((a) => a.status === "confirmed").length,
-    })
-  }
-
   const getDaysInMonth = (date: Date) => {
     const year = date.getFullYear()
     const month = date.getMonth()
@@ -239,7 +284,7 @@ export default function AppointmentsPage() {
         title: "Success",
         description: "Appointment status updated successfully",
       })
-      await loadAppointments()
+      await Promise.all([loadAppointments(), loadStats()])
     } catch (error: any) {
       console.error("Failed to update appointment status:", error)
       toast({
@@ -504,6 +549,13 @@ export default function AppointmentsPage() {
               </TableBody>
             </Table>
           </div>
+          {nextCursor && !loading && (
+            <div className="flex justify-center border-t p-4">
+              <Button variant="outline" onClick={loadMoreAppointments} disabled={loadingMore}>
+                {loadingMore ? "Loading..." : "Load more"}
+              </Button>
+            </div>
+          )}
         </Card>
       ) : (
         <Card className="overflow-hidden p-6 shadow-sm">
@@ -700,6 +752,32 @@ export default function AppointmentsPage() {
                 />
               </div>
             </div>
+            {slotTaken && (
+              <div className="rounded-md border border-amber-300 bg-amber-50 p-3">
+                <p className="text-sm font-semibold text-amber-800">{slotTaken.message}</p>
+                {slotTaken.alternatives.length > 0 && (
+                  <div className="mt-2 flex flex-wrap gap-2">
+                    {slotTaken.alternatives.map((alternative) => (
+                      <Button
+                        key={`${alternative.date}-${alternative.time}`}
+                        variant="outline"
+                        size="sm"
+                        onClick={() => {
+                          setNewAppointment({
+                            ...newAppointment,
+                            appointmentDate: alternative.date,
+                            appointmentTime: alternative.time,
+                          })
+                          setSlotTaken(null)
+                        }}
+                      >
+                        {new Date(`${alternative.date}T00:00:00`).toLocaleDateString()} {alternative.time}
+                      </Button>
+                    ))}
+                  </div>
+                )}
+              </div>
+            )}
           </div>
           <DialogFooter>
             <Button variant="outline" onClick={() => setIsAddDialogOpen(false)}>
@@ -13,10 +13,14 @@ import type { Patient, Appointment } from "@/lib/types"
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { useToast } from "@/hooks/use-toast"
 
+const PAGE_SIZE = 48
+
 export default function PatientsPage() {
   const [patients, setPatients] = useState<Patient[]>([])
-  const [appointments, setAppointments] = useState<Appointment[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [searchTerm, setSearchTerm] = useState("")
+  const [searchResults, setSearchResults] = useState<Patient[] | null>(null)
   const [isViewDialogOpen, setIsViewDialogOpen] = useState(false)
   const [selectedPatient, setSelectedPatient] = useState<Patient | null>(null)
   const [patientAppointments, setPatientAppointments] = useState<Appointment[]>([])
@@ -25,14 +29,37 @@ export default function PatientsPage() {
 
   useEffect(() => {
     loadPatients()
-    loadAppointments()
   }, [])
 
+  // Search on the server (indexed phone / name / Telegram ID lookup), debounced while typing
+  useEffect(() => {
+    const term = searchTerm.trim()
+    // Names need 3+ characters and phone prefixes 4+ digits on the server; show the listing until then
+    if (term.length < 3) {
+      setSearchResults(null)
+      return
+    }
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const data = await api.searchPatients(term)
+        if (!cancelled) setSearchResults(Array.isArray(data) ? data : [])
+      } catch (error: any) {
+        console.error("Failed to search patients:", error)
+      }
+    }, 300)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [searchTerm])
+
   const loadPatients = async () => {
     try {
       setLoading(true)
-      const data = await api.getPatients()
-      setPatients(Array.isArray(data) ? data : [])
+      const page = await api.getPatients({ limit: PAGE_SIZE })
+      setPatients(page.items)
+      setNextCursor(page.nextCursor)
     } catch (error: any) {
       console.error("Failed to fetch patients:", error)
       toast({
@@ -41,34 +68,43 @@ export default function PatientsPage() {
         variant: "destructive",
       })
       setPatients([])
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }
 
-  const loadAppointments = async () => {
+  const loadMorePatients = async () => {
+    if (!nextCursor) return
     try {
-      const data = await api.getAppointments()
-      setAppointments(Array.isArray(data) ? data : [])
+      setLoadingMore(true)
+      const page = await api.getPatients({ limit: PAGE_SIZE, cursor: nextCursor })
+      setPatients((prev) => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
     } catch (error: any) {
-      console.error("Failed to fetch appointments:", error)
-      setAppointments([])
+      console.error("Failed to fetch more patients:", error)
+      toast({
+        title: "Error",
+        description: error.message || "Failed to fetch patients",
+        variant: "destructive",
+      })
+    } finally {
+      setLoadingMore(false)
     }
   }
 
-  const filteredPatients = patients.filter(
-    (patient) =>
-      patient.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      patient.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      patient.phone.toLowerCase().includes(searchTerm.toLowerCase()),
-  )
+  const filteredPatients = searchResults ?? patients
 
-  const openViewDialog = (patient: Patient) => {
+  const openViewDialog = async (patient: Patient) => {
     setSelectedPatient(patient)
-    // Filter appointments by patient name (since we don't have patientId in current schema)
-    const patientAppts = appointments.filter((appt) => appt.patientName === patient.name)
-    setPatientAppointments(patientAppts)
+    setPatientAppointments([])
     setIsViewDialogOpen(true)
+    try {
+      const data = await api.getPatientAppointments(patient.id)
+      setPatientAppointments(Array.isArray(data) ? data : [])
+    } catch (error: any) {
+      console.error("Failed to fetch patient appointments:", error)
+    }
   }
 
   const getStatusBadgeColor = (status: string) => {
@@ -97,7 +133,7 @@ export default function PatientsPage() {
         <div className="relative">
           <Search className="absolute left-3 top-1/2 h-4 w-4 -translate-y-1/2 text-muted-foreground" />
           <Input
-            placeholder="Search by name, email, or phone..."
+            placeholder="Search by name, phone, or Telegram ID..."
             value={searchTerm}
             onChange={(e) => setSearchTerm(e.target.value)}
             className="pl-10"
@@ -186,6 +222,15 @@ export default function PatientsPage() {
         </div>
       )}
 
+      {/* Search results come back in one piece; the full listing loads page by page */}
+      {!loading && searchResults === null && nextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={loadMorePatients} disabled={loadingMore}>
+            {loadingMore ? "Loading..." : "Load more"}
+          </Button>
+        </div>
+      )}
+
       {/* View Dialog */}
       <Dialog open={isViewDialogOpen} onOpenChange={setIsViewDialogOpen}>
         <DialogContent className="max-w-4xl max-h-[90vh] overflow-y-auto">
@@ -249,7 +249,7 @@ export default function SettingsPage() {
                           const url = window.URL.createObjectURL(blob)
                           const a = document.createElement("a")
                           a.href = url
-                          a.download = `hospital_summary_${new Date().getTime()}.txt`
+                          a.download = `hospital_summary_${new Date().getTime()}.pdf`
                           a.click()
                           toast({
                             title: "Success",
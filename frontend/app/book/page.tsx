@@ -1,5 +1,5 @@
 "use client"
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import Link from "next/link"
 import { useSearchParams } from "next/navigation"
 import { Button } from "@/components/ui/button"
@@ -27,12 +27,41 @@ import {
   getActiveSpecializations,
   getActiveDoctorsBySpecialization,
   createAppointment,
+  SlotTakenError,
   type Doctor,
   type Specialization,
+  type SlotAlternative,
 } from "@/lib/api"
 
 // Time slots are now fetched dynamically from API based on selected date
 
+// "14:30" -> "2:30 PM", the format the time slot buttons use
+const formatSlotTime = (time: string) => {
+  const [hours, minutes] = time.split(":")
+  const hour = parseInt(hours)
+  const period = hour >= 12 ? "PM" : "AM"
+  const displayHour = hour === 0 ? 12 : hour > 12 ? hour - 12 : hour
+  return `${displayHour}:${minutes} ${period}`
+}
+
+// "YYYY-MM-DD" from the local date components
+// (toISOString converts to UTC which can shift the date back by one day)
+const toDateString = (date: Date) => {
+  const year = date.getFullYear()
+  const month = String(date.getMonth() + 1).padStart(2, "0")
+  const day = String(date.getDate()).padStart(2, "0")
+  return `${year}-${month}-${day}`
+}
+
+// "2:30 PM" -> "14:30"
+const toSlotTime = (time: string) => {
+  const [timePart, period] = time.split(" ")
+  let [hours, minutes] = timePart.split(":").map(Number)
+  if (period === "PM" && hours !== 12) hours += 12
+  if (period === "AM" && hours === 12) hours = 0
+  return `${String(hours).padStart(2, "0")}:${String(minutes).padStart(2, "0")}`
+}
+
 const getDaysInMonth = (month: number, year: number) => {
   return new Date(year, month + 1, 0).getDate()
 }
@@ -60,6 +89,10 @@ export default function BookAppointmentPage() {
   const searchParams = useSearchParams()
   const [currentStep, setCurrentStep] = useState(1)
   const [isSubmitted, setIsSubmitted] = useState(false)
+  // Resubmitting the same booking reuses its Idempotency-Key, so it can't be booked twice
+  const bookingKey = useRef<{ body: string; key: string } | null>(null)
+  // Set when the chosen slot was taken by someone else; offers the next free ones
+  const [slotTaken, setSlotTaken] = useState<{ message: string; alternatives: SlotAlternative[] } | null>(null)
 
   const [specializations, setSpecializations] = useState<Specialization[]>([])
   const [doctors, setDoctors] = useState<Doctor[]>([])
@@ -150,12 +183,7 @@ export default function BookAppointmentPage() {
 
       setIsLoadingTimeSlots(true)
       try {
-        // Construct date string using local time components to avoid timezone shifts
-        // (toISOString converts to UTC which can shift the date back by one day)
-        const year = selectedDate.getFullYear();
-        const month = String(selectedDate.getMonth() + 1).padStart(2, '0');
-        const day = String(selectedDate.getDate()).padStart(2, '0');
-        const dateStr = `${year}-${month}-${day}`;
+        const dateStr = toDateString(selectedDate)
 
         const doctorId = selectedDoctorData.id
 
@@ -174,13 +202,7 @@ export default function BookAppointmentPage() {
           // Convert 24-hour format to 12-hour format with AM/PM
           const formattedSlots = data
             .filter((slot: any) => slot.available)
-            .map((slot: any) => {
-              const [hours, minutes] = slot.time.split(':')
-              const hour = parseInt(hours)
-              const period = hour >= 12 ? 'PM' : 'AM'
-              const displayHour = hour === 0 ? 12 : hour > 12 ? hour - 12 : hour
-              return `${displayHour}:${minutes} ${period}`
-            })
+            .map((slot: any) => formatSlotTime(slot.time))
 
           console.log('Formatted slots:', formattedSlots)
           setTimeSlots(formattedSlots)
@@ -214,16 +236,7 @@ export default function BookAppointmentPage() {
         return
       }
 
-      const appointmentDate = new Date(selectedDate)
-      const [timePart, period] = selectedTime.split(" ")
-      let [hours, minutes] = timePart.split(":").map(Number)
-
-      if (period === "PM" && hours !== 12) hours += 12
-      if (period === "AM" && hours === 12) hours = 0
-
-      appointmentDate.setHours(hours, minutes, 0, 0)
-
-      const result = await createAppointment({
+      const booking = {
         patient_name: patientInfo.fullName,
         phone: patientInfo.phone,
         email: patientInfo.email,
@@ -231,17 +244,36 @@ export default function BookAppointmentPage() {
         gender: patientInfo.gender,
         service: selectedService,
         doctor: selectedDoctor,
-        appointment_datetime: appointmentDate.toISOString(),
-      })
+        // Clinic wall-clock date and time, the same slot labels the bot and availability use
+        appointmentDate: toDateString(selectedDate),
+        appointmentTime: toSlotTime(selectedTime),
+      }
+      const body = JSON.stringify(booking)
+      if (bookingKey.current?.body !== body) {
+        bookingKey.current = { body, key: crypto.randomUUID() }
+      }
+      const result = await createAppointment(booking, bookingKey.current.key)
 
+      setSlotTaken(null)
       setBookingToken(result.token)
       setIsSubmitted(true)
     } catch (error) {
+      if (error instanceof SlotTakenError) {
+        setSlotTaken({ message: error.message, alternatives: error.alternatives })
+        return
+      }
       console.error("Error submitting booking:", error)
       alert(`Booking failed: ${error instanceof Error ? error.message : "Unknown error"}`)
     }
   }
 
+  const chooseAlternative = (alternative: SlotAlternative) => {
+    const [year, month, day] = alternative.date.split("-").map(Number)
+    setSelectedDate(new Date(year, month - 1, day))
+    setSelectedTime(formatSlotTime(alternative.time))
+    setSlotTaken(null)
+  }
+
   const canProceedToNextStep = () => {
     if (currentStep === 1) return selectedService !== ""
     if (currentStep === 2) return selectedDoctor !== ""
@@ -778,6 +810,30 @@ export default function BookAppointmentPage() {
                     <span className="font-semibold">{patientInfo.email}</span>
                   </div>
                 </div>
+                {slotTaken && (
+                  <div className="rounded-xl border border-amber-300 bg-amber-50 p-4">
+                    <p className="font-semibold text-amber-800">{slotTaken.message}</p>
+                    {slotTaken.alternatives.length > 0 ? (
+                      <>
+                        <p className="mt-1 text-sm text-amber-700">Next free slots with this doctor:</p>
+                        <div className="mt-3 flex flex-wrap gap-2">
+                          {slotTaken.alternatives.map((alternative) => (
+                            <Button
+                              key={`${alternative.date}-${alternative.time}`}
+                              variant="outline"
+                              size="sm"
+                              onClick={() => chooseAlternative(alternative)}
+                            >
+                              {new Date(`${alternative.date}T00:00:00`).toLocaleDateString()} {formatSlotTime(alternative.time)}
+                            </Button>
+                          ))}
+                        </div>
+                      </>
+                    ) : (
+                      <p className="mt-1 text-sm text-amber-700">Please go back and pick another date.</p>
+                    )}
+                  </div>
+                )}
               </div>
             )}
 
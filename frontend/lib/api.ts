@@ -1,10 +1,11 @@
 import { getAdminToken } from "./admin-auth"
+import type { Appointment, Patient } from "./types"
 export type { Doctor, Specialization, Appointment } from "./types"
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000"
 
-// Centralized API call function with automatic token injection and error handling
-export async function apiCall(endpoint: string, options: RequestInit = {}) {
+// Centralized API request with automatic token injection and error handling
+async function apiRequest(endpoint: string, options: RequestInit = {}): Promise<Response> {
   const token = getAdminToken()
 
   const headers: Record<string, string> = {
@@ -30,7 +31,29 @@ export async function apiCall(endpoint: string, options: RequestInit = {}) {
     throw new Error(error.detail || `Request failed with status ${response.status}`)
   }
 
-  return response.json()
+  return response
+}
+
+export async function apiCall(endpoint: string, options: RequestInit = {}) {
+  return (await apiRequest(endpoint, options)).json()
+}
+
+export interface Page<T> {
+  items: T[]
+  // Pass back as `cursor` to get the next page; null on the last page
+  nextCursor: string | null
+}
+
+// One page of a keyset-paginated listing (the server sends the next cursor in X-Next-Cursor)
+export async function apiPage<T = any>(endpoint: string, params: Record<string, string | number | undefined> = {}): Promise<Page<T>> {
+  const query = new URLSearchParams()
+  for (const [key, value] of Object.entries(params)) {
+    if (value !== undefined && value !== "") query.set(key, String(value))
+  }
+  const qs = query.toString()
+  const response = await apiRequest(`${endpoint}${qs ? `?${qs}` : ""}`)
+  const data = await response.json()
+  return { items: Array.isArray(data) ? data : [], nextCursor: response.headers.get("X-Next-Cursor") }
 }
 
 // ============================================================================
@@ -78,12 +101,30 @@ export async function getActiveDoctorsBySpecialization(specialization: string):
   }
 }
 
+export interface SlotAlternative {
+  date: string // YYYY-MM-DD
+  time: string // HH:MM
+}
+
+// 409 from a booking whose slot was taken first; carries the next free slots to offer instead
+export class SlotTakenError extends Error {
+  alternatives: SlotAlternative[]
+
+  constructor(message: string, alternatives: SlotAlternative[] = []) {
+    super(message)
+    this.name = "SlotTakenError"
+    this.alternatives = alternatives
+  }
+}
+
 // Create appointment booking (public - no auth required)
-export async function createAppointment(appointment: any): Promise<{ token: string }> {
+export async function createAppointment(appointment: any, idempotencyKey?: string): Promise<{ token: string }> {
   const response = await fetch(`${API_BASE_URL}/api/appointments`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
+      // Same key on a retry returns the original booking instead of creating another
+      ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
     },
     body: JSON.stringify({
       ...appointment,
@@ -92,8 +133,12 @@ export async function createAppointment(appointment: any): Promise<{ token: stri
   })
 
   if (!response.ok) {
-    const errorData = await response.json()
-    throw new Error(errorData.detail || "Failed to create appointment")
+    const errorData = await response.json().catch(() => ({}))
+    const detail = errorData.detail
+    if (detail?.code === "slot_taken") {
+      throw new SlotTakenError(detail.message, detail.alternatives)
+    }
+    throw new Error((typeof detail === "string" ? detail : detail?.message) || "Failed to create appointment")
   }
 
   return response.json()
@@ -134,17 +179,24 @@ export const api = {
   deleteSpecialization: (id: string | number) => apiCall(`/api/specializations/${id}`, { method: "DELETE" }),
 
   // Appointments
-  getAppointments: (params?: { status?: string }) => {
-    const query = new URLSearchParams(params as Record<string, string>).toString()
-    return apiCall(`/api/appointments${query ? `?${query}` : ""}`)
-  },
+  getAppointments: (params: {
+    status?: string
+    date_from?: string
+    date_to?: string
+    doctor_id?: number
+    limit?: number
+    cursor?: string
+  } = {}) => apiPage<Appointment>("/api/appointments", params),
   getAppointment: (id: string | number) => apiCall(`/api/appointments/${id}`),
   updateAppointmentStatus: (id: string | number, status: string) =>
     apiCall(`/api/appointments/${id}/status`, { method: "PATCH", body: JSON.stringify({ status }) }),
 
   // Patients
-  getPatients: () => apiCall("/api/patients"),
+  getPatients: (params: { limit?: number; cursor?: string } = {}) => apiPage<Patient>("/api/patients", params),
   getPatient: (id: string | number) => apiCall(`/api/patients/${id}`),
+  getPatientAppointments: (id: string | number) => apiCall(`/api/patients/${id}/appointments`),
+  searchPatients: (q: string, limit = 50) =>
+    apiCall(`/api/patients/search?${new URLSearchParams({ q, limit: String(limit) }).toString()}`),
 
   // Banners
   getBanners: (params?: { status?: string }) => {